@@ -1,3 +1,82 @@
+from datetime import date
+
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from commons.utils import bulk_upsert
+from site_audit.models import DailyPageScores, Page
+from users.models import Company
+
+
+class BulkUpsertTestCase(TestCase):
+    """Tests of 'bulk_upsert()', on PostgreSQL ('COPY') and on the 'bulk_create' fallback of other databases."""
+
+    def setUp(self):
+        """Create a website with two saved pages."""
+        self.company = Company.objects.create(name="Example", website="https://example.com")
+        bulk_upsert(
+            Page,
+            [
+                Page(url="https://example.com", company=self.company, content_sha256="a", outlinks=[["/b", "B"]]),
+                Page(url="https://example.com/b", company=self.company, content_sha256="b"),
+            ],
+        )
+
+    def test_insert(self):
+        """Insert the rows with all their fields."""
+        page = Page.objects.get(url="https://example.com")
+        self.assertEqual(Page.objects.filter(company=self.company).count(), 2)
+        self.assertEqual((page.content_sha256, page.outlinks, page.etag), ("a", [["/b", "B"]], ""))
+        self.assertEqual(bulk_upsert(Page, []), 0)
+
+    def test_update_conflicts(self):
+        """Update the 'update_fields' of conflicting rows only, and insert the others."""
+        bulk_upsert(
+            Page,
+            [
+                Page(url="https://example.com", company=self.company, content_sha256="a2", etag='"2"'),
+                Page(url="https://example.com/c", company=self.company, content_sha256="c"),
+            ],
+            unique_fields=["company", "url"],
+            update_fields=["content_sha256"],
+        )
+        pages = dict(Page.objects.values_list("url", "content_sha256"))
+        self.assertEqual(
+            pages, {"https://example.com": "a2", "https://example.com/b": "b", "https://example.com/c": "c"}
+        )
+        self.assertEqual(Page.objects.get(url="https://example.com").etag, "")
+
+    def test_ignore_conflicts(self):
+        """Skip conflicting rows with 'ignore_conflicts'."""
+        bulk_upsert(
+            Page,
+            [
+                Page(url="https://example.com/b", company=self.company, content_sha256="b2"),
+                Page(url="https://example.com/c", company=self.company, content_sha256="c"),
+            ],
+            ignore_conflicts=True,
+        )
+        self.assertEqual(Page.objects.get(url="https://example.com/b").content_sha256, "b")
+        self.assertTrue(Page.objects.filter(url="https://example.com/c").exists())
+
+    def test_merge_fields(self):
+        """Merge the keys of 'merge_fields' with the ones of conflicting rows on PostgreSQL, replace them otherwise."""
+        today = date.today()
+        for scores in ({"A": 1.0, "B": 0.5}, {"B": 1.0, "C": 0.0}):
+            bulk_upsert(
+                DailyPageScores,
+                [
+                    DailyPageScores(page_id="https://example.com", company=self.company, date=today, scores=scores),
+                    DailyPageScores(page_id="https://example.com/b", company=self.company, date=today, scores={}),
+                ],
+                unique_fields=["page", "date"],
+                update_fields=["scores"],
+                merge_fields=["scores"],
+                batch_size=1,
+            )
+        scores = DailyPageScores.objects.get(page_id="https://example.com", date=today).scores
+        if connection.vendor == "postgresql":
+            self.assertEqual(scores, {"A": 1.0, "B": 1.0, "C": 0.0})
+        else:
+            self.assertEqual(scores, {"B": 1.0, "C": 0.0})
+        self.assertEqual(DailyPageScores.objects.count(), 2)
@@ -1,4 +1,14 @@
+import importlib
+import io
+import json
+import queue
+import threading
+from functools import cache
+from time import monotonic
+
 from django import db
+from django.db import transaction
+from django.db.models import JSONField
 
 
 class OpenAndCloseDbConnection:
@@ -33,14 +43,45 @@ def get_nested_value(dictionary, keys_str):
     return dictionary
 
 
-import importlib
+def compile_nested_getter(keys_str):
+    """
+    Compile a dotted path of keys into a function retrieving the nested value from a dictionary.
+
+    The returned function behaves like 'get_nested_value(dictionary, keys_str)', without splitting the path
+    again on every call.
+    """
+    keys = tuple(keys_str.split('.'))
+
+    def getter(dictionary):
+        for key in keys:
+            if isinstance(dictionary, dict):
+                dictionary = dictionary.get(key)
+            else:
+                return None
+        return dictionary
+
+    return getter
+
+
+@cache
+def import_from_str(function_path):
+    """
+    Import a function from a string path in the format 'module.submodule.function'.
+
+    Results are cached: each path is resolved only once per process.
+    """
+    module_path, function_name = function_path.rsplit('.', 1)
+    module = importlib.import_module(module_path)
+    return getattr(module, function_name)
+
 
 def call_func_from_str(function_path, *args, **kwargs):
     """
     Call a function from a string path.
 
-    This function takes a string path to a function, imports the module dynamically,
-    retrieves the function from the module, and calls it with the provided arguments and keyword arguments.
+    This function takes a string path to a function, imports the module dynamically (once per path, see
+    'import_from_str'), retrieves the function from the module, and calls it with the provided arguments and
+    keyword arguments.
 
     Parameters:
     function_path (str): A string path to the function in the format 'module.submodule.function'.
@@ -50,7 +91,213 @@ def call_func_from_str(function_path, *args, **kwargs):
     Returns:
     The return value of the function call.
     """
-    module_path, function_name = function_path.rsplit('.', 1)
-    module = importlib.import_module(module_path)
-    function = getattr(module, function_name)
-    return function(*args, **kwargs)
\ No newline at end of file
+    return import_from_str(function_path)(*args, **kwargs)
+
+
+# Characters escaped in the text format of PostgreSQL 'COPY'
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _get_copy_value(field, obj, connection):
+    """Return the value of a model field formatted for the text format of PostgreSQL 'COPY'."""
+    value = field.pre_save(obj, add=True)
+    if isinstance(field, JSONField):
+        value = None if value is None else json.dumps(value, cls=field.encoder)
+    else:
+        value = field.get_db_prep_save(value, connection)
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).translate(COPY_ESCAPES)
+
+
+def bulk_upsert(
+        model, objs, unique_fields=None, update_fields=None, ignore_conflicts=False, batch_size=10000, merge_fields=None
+):
+    """
+    Insert model instances in bulk, like 'bulk_create' (with the same conflict options).
+
+    On PostgreSQL, rows are streamed with 'COPY FROM STDIN' into a temporary table, 'batch_size' rows at a time, and
+    merged into the model table with a single 'INSERT ... ON CONFLICT'. Other databases fall back to 'bulk_create'.
+    Unlike 'bulk_create', primary keys generated by the database are not set on the instances.
+
+    Parameters:
+    model: The model class of the instances.
+    objs (iterable): The model instances to insert.
+    unique_fields (list): The fields of the unique constraint identifying conflicting rows (with 'update_fields').
+    update_fields (list): The fields updated on conflicting rows (conflicts raise an error if not set).
+    ignore_conflicts (bool): Whether to skip conflicting rows instead.
+    batch_size (int): The number of rows sent to the database at a time.
+    merge_fields (list): The JSON fields of 'update_fields' whose keys are added to the ones of conflicting rows
+        instead of replacing them, in the same statement (PostgreSQL only: other databases replace them).
+
+    Returns:
+    The number of rows inserted or updated.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+    connection = db.connections[db.router.db_for_write(model)]
+    if connection.vendor != "postgresql":
+        model.objects.bulk_create(
+            objs,
+            batch_size,
+            ignore_conflicts=ignore_conflicts,
+            update_conflicts=bool(update_fields),
+            update_fields=update_fields,
+            unique_fields=unique_fields if update_fields else None,
+        )
+        return len(objs)
+
+    opts = model._meta
+    quote = connection.ops.quote_name
+    # Primary keys generated by the database are left to the model table
+    fields = [field for field in opts.concrete_fields if field is not opts.auto_field]
+    columns = ", ".join(quote(field.column) for field in fields)
+    table = quote(opts.db_table)
+    temp_table = quote(f"bulk_{opts.db_table}")
+    if update_fields:
+        targets = ", ".join(quote(opts.get_field(name).column) for name in unique_fields)
+        merge_fields = set(merge_fields or [])
+        updates = ", ".join(
+            f"{column} = {table}.{column} || EXCLUDED.{column}" if name in merge_fields
+            else f"{column} = EXCLUDED.{column}"
+            for name, column in ((name, quote(opts.get_field(name).column)) for name in update_fields)
+        )
+        on_conflict = f" ON CONFLICT ({targets}) DO UPDATE SET {updates}"
+    elif ignore_conflicts:
+        on_conflict = " ON CONFLICT DO NOTHING"
+    else:
+        on_conflict = ""
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Same columns as the model table, without any constraint. The one of a previous call within the same outer
+        # transaction is dropped first, looked up in the temporary schema only
+        cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{temp_table}")
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {temp_table} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA"
+        )
+        for i in range(0, len(objs), batch_size):
+            rows = io.StringIO()
+            for obj in objs[i:i + batch_size]:
+                rows.write("\t".join(_get_copy_value(field, obj, connection) for field in fields))
+                rows.write("\n")
+            rows.seek(0)
+            cursor.copy_expert(f"COPY {temp_table} ({columns}) FROM STDIN", rows)
+        cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {temp_table}{on_conflict}")
+        return cursor.rowcount
+
+
+class BufferedWriter:
+    """
+    Write model instances to the database as they are produced, from a background thread with its own connection.
+
+    Instances are buffered and written in batches, every 'batch_size' instances or 'flush_interval' seconds, whichever
+    comes first: memory stays bounded and an interrupted run only loses its last batch. Each batch is written in a
+    single transaction. Instances added together (with one 'extend()' call) are always written in the same batch.
+    Use it as a context manager, or call 'start()' and 'close()'.
+
+    Kwargs for initialization:
+    -------------------------
+      writers (dict): The function writing a list of instances, for each model ({model: function}). In a batch,
+        models are written in this order (e.g. pages before their audits).
+      batch_size (int): The number of instances written at once.
+      flush_interval (float): The maximum number of seconds an instance waits before being written.
+      on_flush (callable): Called after each batch (in the background thread) with the written instances, by model
+        ({model: [instances]}), e.g. to record the progress of the run.
+    """
+    def __init__(self, writers: dict, batch_size: int = 5000, flush_interval: float = 10.0, on_flush=None):
+        self.writers = writers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.written = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._error = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Also flushed on error: what has been produced so far is kept
+        self.close()
+
+    def start(self):
+        """Start the background thread."""
+        self._thread = threading.Thread(target=self._run, name="BufferedWriter", daemon=True)
+        self._thread.start()
+        return self
+
+    def add(self, obj) -> None:
+        """Queue a model instance to be written."""
+        self.extend([obj])
+
+    def extend(self, objs, on_written=None) -> None:
+        """
+        Queue model instances to be written (in the same batch), raise if a previous batch failed.
+
+        'on_written' is called (in the background thread, without arguments) once they have been written.
+        """
+        if self._error is not None:
+            raise self._error
+        objs = list(objs)
+        if objs:
+            self._queue.put((objs, on_written))
+        elif on_written is not None:
+            on_written()
+
+    def close(self) -> None:
+        """Write the remaining instances and stop the background thread, raise if a batch failed."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            raise self._error
+
+    def _write(self, buffer: list, callbacks: list) -> None:
+        """Write a batch of instances, model by model, in a single transaction, then call their 'on_written'."""
+        batch = {model: [] for model in self.writers}
+        for obj in buffer:
+            batch[type(obj)].append(obj)
+        with transaction.atomic():
+            for model, objs in batch.items():
+                if objs:
+                    self.writers[model](objs)
+        self.written += len(buffer)
+        if self.on_flush is not None:
+            self.on_flush(batch)
+        for callback in callbacks:
+            callback()
+
+    def _run(self) -> None:
+        """Write the queued instances in batches until 'close()' is called."""
+        buffer, callbacks = [], []
+        deadline = monotonic() + self.flush_interval
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(deadline - monotonic(), 0))
+                except queue.Empty:
+                    item = ([], None)
+                if item is None:
+                    break
+                objs, on_written = item
+                buffer.extend(objs)
+                if on_written is not None:
+                    callbacks.append(on_written)
+                if len(buffer) >= self.batch_size or monotonic() >= deadline:
+                    if buffer:
+                        self._write(buffer, callbacks)
+                        buffer, callbacks = [], []
+                    deadline = monotonic() + self.flush_interval
+            if buffer:
+                self._write(buffer, callbacks)
+        except Exception as e:
+            print(f"Error while writing to the database: {e}")
+            self._error = e
+        finally:
+            # Connections are per thread: only closes the ones of the writer
+            db.connections.close_all()
@@ -209,3 +209,10 @@ ASYNC_TASK = os.getenv("ASYNC_TASK", "django_rq")  # DJANGO_RQ or MODAL.COM
 MODAL_TOKEN_ID = os.getenv("MODAL_TOKEN_ID", None)
 MODAL_TOKEN_SECRET = os.getenv("MODAL_TOKEN_SECRET", None)
 # Modal deploy command : modal deploy __init__.py --env dev
+
+# Site audit: store daily page audits as one row per page per day ('DailyPageScores') instead of one row per audit
+SITE_AUDIT_COMPACT_STORAGE = os.environ.get("SITE_AUDIT_COMPACT_STORAGE", "") == "1"
+# Site audit: number of days daily page audits are kept (forever if not set)
+SITE_AUDIT_RETENTION_DAYS = int(os.environ.get("SITE_AUDIT_RETENTION_DAYS", 0)) or None
+# Site audit: shards of a large website crawl pop URLs from one frontier in Redis instead of partitioning its URLs
+SITE_AUDIT_SHARED_FRONTIER = os.environ.get("SITE_AUDIT_SHARED_FRONTIER", "") == "1"
@@ -1,8 +1,24 @@
+from site_audit.document import Document, parse_document
 
 
-def crawl_depth(url: str = None, page_title: str = None, page_content: str = None, **kwargs) -> float:
-    """Return the depth of the page."""
-    return kwargs.get("depth", 0)
+def run_custom_audits(
+        url: str, page_content: str, page_title: str = None, document: Document = None, **kwargs
+) -> dict[str, float]:
+    """
+    Run every custom audit on a page and return their scores ({audit name: score}).
+
+    The page is parsed only once: all audits read from the same 'Document' index, received as 'document' (parsed
+    from 'page_content' if not given).
+    """
+    from site_audit.enums import AuditChoices
+
+    document = document or parse_document(page_content)
+    if page_title is None:
+        page_title = document.title
+    return {
+        audit.value: function(url=url, page_title=page_title, page_content=page_content, document=document, **kwargs)
+        for audit, function in AuditChoices.get_custom_audit_functions()
+    }
 
 
 def has_url_issues(url: str = None, page_title: str = None, page_content: str = None, **kwargs) -> float:
@@ -12,8 +28,11 @@ def has_url_issues(url: str = None, page_title: str = None, page_content: str =
     return 1.0
 
 
-def has_only_one_h1(url: str = None, page_title: str = None, page_content: str = None, **kwargs) -> float:
+def has_only_one_h1(
+        url: str = None, page_title: str = None, page_content: str = None, document: Document = None, **kwargs
+) -> float:
     """Check if the HTML has only one H1 tag."""
-    if page_content.count("<h1>") == 1:
+    document = document or parse_document(page_content)
+    if document.count("h1") == 1:
         return 1.0
     return 0.0
@@ -0,0 +1,161 @@
+import importlib
+import sys
+import timeit
+import tracemalloc
+from time import perf_counter
+
+from bs4 import BeautifulSoup
+
+from site_audit.audits import run_custom_audits
+from site_audit.document import parse_document
+from site_audit.enums import AuditChoices
+from site_audit.fingerprints import FingerprintSet
+from site_audit.links import PARSER, extract_links
+
+
+def _legacy_get_internal_links(page_content: str, website: str, domain: str) -> list[str]:
+    """Copy of the BeautifulSoup based 'Crawler._get_internal_links', used as a baseline."""
+    internal_links = []
+    bs = BeautifulSoup(page_content, 'html.parser')
+    for link in bs.findAll('a'):
+        href = link.get('href')
+        if not href or href.startswith("mailto") or href.startswith("tel") or href.startswith("javascript"):
+            continue
+        if not href.startswith('http'):
+            leading_slash = '' if href.startswith('/') else '/'
+            href = website + leading_slash + href
+        if '#' in href:
+            href = href.split('#')[0]
+        if href.startswith('http://' + domain) or href.startswith('https://' + domain) and not href.endswith('.pdf'):
+            internal_links.append(href[:-1] if href.endswith('/') else href)
+    return internal_links
+
+
+def build_html(links: int = 5000) -> str:
+    """Return a large HTML page containing 'links' links of all kinds (relative, absolute, external...)."""
+    hrefs = ("/page-{i}", "page-{i}/", "https://example.com/a/{i}#top", "https://other.com/{i}", "mailto:a{i}@b.c")
+    blocks = [
+        f'<div class="card"><p>Paragraph {i} with some <b>bold</b> text.</p>'
+        f'<a href="{hrefs[i % len(hrefs)].format(i=i)}" class="link">Link <span>{i}</span></a></div>'
+        for i in range(links)
+    ]
+    return f"<html><head><title>Benchmark</title></head><body>{''.join(blocks)}</body></html>"
+
+
+def benchmark_links(repeat: int = 5) -> None:
+    """Compare the link extraction of the crawler with the previous BeautifulSoup implementation."""
+    for links in (500, 5000, 20000):
+        html = build_html(links)
+        legacy = min(timeit.repeat(
+            lambda: _legacy_get_internal_links(html, "https://example.com", "example.com"), number=1, repeat=repeat
+        ))
+        current = min(timeit.repeat(
+            lambda: extract_links(html, "https://example.com/blog/post"), number=1, repeat=repeat
+        ))
+        print(
+            f"{links} links ({len(html) / 1024:.0f} KB, parser: {PARSER}): "
+            f"BeautifulSoup {legacy * 1000:.1f} ms, extract_links {current * 1000:.1f} ms "
+            f"(x{legacy / current:.1f})"
+        )
+
+
+def _legacy_run_custom_audits(url: str, page_title: str, page_content: str) -> list:
+    """Copy of the previous 'Crawler._run_custom_audits' loop (list rebuilt and functions imported on each call)."""
+    scores = []
+    for audit in [AuditChoices(audit) for audit in AuditChoices.values if not audit.startswith("PSI_")]:
+        if "." not in audit.path:
+            continue
+        module_path, function_name = audit.path.rsplit('.', 1)
+        function = getattr(importlib.import_module(module_path), function_name)
+        scores.append(function(url=url, page_title=page_title, page_content=page_content, depth=1))
+    return scores
+
+
+def benchmark_audits(pages: int = 10000, repeat: int = 5) -> None:
+    """Compare the per-page overhead of the custom audits with the previous uncached audit lookups."""
+    # A minimal page: the cost of parsing real pages is measured by the 'document' benchmark
+    html = "<html><head><title>Benchmark</title></head><body><h1>Benchmark</h1></body></html>"
+    for name, run in (("uncached", _legacy_run_custom_audits), ("cached registry", run_custom_audits)):
+        duration = min(timeit.repeat(
+            lambda: run("https://example.com/page", page_title="Benchmark", page_content=html),
+            number=pages, repeat=repeat
+        ))
+        print(f"{name}: {duration / pages * 1e6:.2f} µs per page ({len(AuditChoices.get_custom_audits())} audits)")
+
+
+def _scan_per_audit(html: str, audits: int) -> list:
+    """Baseline: each audit scanning the raw HTML on its own, like 'has_only_one_h1' used to."""
+    return [html.count(f"<h{audit % 6 + 1}") for audit in range(audits)]
+
+
+def _read_document(html: str, audits: int) -> list:
+    """Parse the page once into a 'Document', then run each audit on the index."""
+    document = parse_document(html)
+    return [document.count(f"h{audit % 6 + 1}") for audit in range(audits)]
+
+
+def benchmark_document(repeat: int = 5) -> None:
+    """Compare audits scanning the raw HTML each with audits sharing a single parsed 'Document', per audit count."""
+    html = build_html(2000)
+    for audits in (1, 10, 50, 200):
+        scan = min(timeit.repeat(lambda: _scan_per_audit(html, audits), number=1, repeat=repeat))
+        shared = min(timeit.repeat(lambda: _read_document(html, audits), number=1, repeat=repeat))
+        print(
+            f"{audits} audits ({len(html) / 1024:.0f} KB): "
+            f"raw scans {scan * 1000:.1f} ms, shared document {shared * 1000:.1f} ms"
+        )
+
+
+def _iter_link_occurrences(urls: int, occurrences: int = 5):
+    """Yield 'urls' distinct URLs 'occurrences' times each, like the links found across the pages of a website."""
+    for i in range(urls * occurrences):
+        product = i % urls
+        yield f"https://example.com/category-{product % 97}/product-{product}?ref=listing"
+
+
+def _dedup(seen_class, urls: int) -> int:
+    """Deduplicate the link occurrences of a website with a set of URLs, return the number of distinct URLs."""
+    seen = seen_class()
+    for url in _iter_link_occurrences(urls):
+        seen.add(url)
+    return len(seen)
+
+
+def _measure_dedup(seen_class, urls: int) -> tuple[float, int]:
+    """Return the duration and the memory (in bytes, traced after the deduplication) of '_dedup()'."""
+    started_at = perf_counter()
+    _dedup(seen_class, urls)
+    duration = perf_counter() - started_at
+    tracemalloc.start()
+    seen = seen_class()
+    for url in _iter_link_occurrences(urls):
+        seen.add(url)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return duration, memory
+
+
+def benchmark_dedup() -> None:
+    """Compare the memory of the visited URLs as a set of strings with the same URLs as 64-bit fingerprints."""
+    for urls in (10000, 100000, 1000000):
+        for name, seen_class in (("set of strings", set), ("fingerprints", FingerprintSet)):
+            duration, memory = _measure_dedup(seen_class, urls)
+            print(
+                f"{urls} URLs ({urls * 5} links), {name}: {memory / 2 ** 20:.1f} MB "
+                f"({memory / urls:.0f} bytes per URL), {duration / (urls * 5) * 1e6:.2f} µs per link"
+            )
+
+
+BENCHMARKS = {
+    "links": benchmark_links,
+    "audits": benchmark_audits,
+    "document": benchmark_document,
+    "dedup": benchmark_dedup,
+}
+
+
+if __name__ == "__main__":
+    # Usage: python -m site_audit.benchmarks [benchmark name...]
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"--- {name} ---")
+        BENCHMARKS[name]()
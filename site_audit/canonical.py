@@ -0,0 +1,115 @@
+import re
+import string
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+from site_audit.exclusions import PREFIX_WILDCARD, ExclusionMatcher
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+UNRESERVED_CHARACTERS = frozenset(string.ascii_letters + string.digits + "-._~")
+# Characters kept as is (besides unreserved ones and escapes) in a path, and in a query parameter
+PATH_SAFE_CHARACTERS = "/:@!$&'()*+,;="
+QUERY_SAFE_CHARACTERS = "/?:@!$'()*+,;="
+ESCAPE_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+LONE_PERCENT_RE = re.compile(r"%(?![0-9A-Fa-f]{2})")
+# Query parameters which never change the content of a page (analytics, ads and session tracking)
+IGNORED_PARAMS = frozenset((
+    "gclid", "dclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid", "twclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "phpsessid", "jsessionid", "sid", "sessionid",
+))
+IGNORED_PARAM_PREFIXES = ("utm_",)
+
+
+def _decode_unreserved(match: re.Match) -> str:
+    """Return the character of an escape if it is unreserved, else the escape in uppercase."""
+    character = chr(int(match.group(1), 16))
+    return character if character in UNRESERVED_CHARACTERS else f"%{match.group(1).upper()}"
+
+
+def normalize_percent_encoding(component: str, safe: str) -> str:
+    """
+    Return a URL component with a single, normalized percent-encoding.
+
+    Escaped unreserved characters are decoded, other escapes are uppercased, and characters which must be escaped
+    (spaces, non-ASCII...) are.
+    """
+    component = LONE_PERCENT_RE.sub("%25", component)
+    return quote(ESCAPE_RE.sub(_decode_unreserved, component), safe=safe + "%")
+
+
+class URLCanonicalizer:
+    """
+    Turn the URLs found while crawling into their canonical form, so that each page is fetched and stored once.
+
+    Canonical URLs have a lowercase scheme and host, no default port, no fragment, no trailing slash, a single
+    percent-encoding (see 'normalize_percent_encoding()') and sorted query parameters, without tracking parameters.
+    Canonicalizers only hold plain data: they can be sent to the processes analyzing pages.
+
+    Kwargs for initialization:
+    -------------------------
+      exclude_url_params (bool): Whether to remove the whole query string: pages only differing by their query
+        parameters are the same page.
+      ignored_params (iterable): The (lowercase) names of the query parameters removed from URLs, besides the ones
+        starting with 'utm_' (IGNORED_PARAMS by default).
+      exclude_patterns (list): A list of patterns (re) of pages not to crawl, searched in canonical URLs.
+      exclude_pages (list): A list of specific pages not to crawl, or of URL prefixes when they end with '*'.
+    """
+    def __init__(
+            self,
+            exclude_url_params: bool = False,
+            ignored_params=IGNORED_PARAMS,
+            exclude_patterns: list[str] = None,
+            exclude_pages: list[str] = None
+    ):
+        self.exclude_url_params = exclude_url_params
+        self.ignored_params = frozenset(ignored_params)
+        self.exclusions = ExclusionMatcher(
+            exclude_patterns, [self._canonicalize_excluded_page(page) for page in exclude_pages or []]
+        )
+
+    def _canonicalize_excluded_page(self, page: str) -> str:
+        """Return the canonical form of an excluded page, keeping the '*' (and the '/' before it) of prefixes."""
+        if not page.endswith(PREFIX_WILDCARD):
+            return self.canonicalize(page)
+        prefix = page[:-len(PREFIX_WILDCARD)]
+        canonical_prefix = self.canonicalize(prefix)
+        if prefix.endswith("/") and not canonical_prefix.endswith("/"):
+            canonical_prefix += "/"
+        return canonical_prefix + PREFIX_WILDCARD
+
+    def _is_ignored_param(self, param: str) -> bool:
+        """Return True if a query parameter ('name=value') must be removed from URLs."""
+        name = unquote(param.split("=", 1)[0]).lower()
+        return name in self.ignored_params or name.startswith(IGNORED_PARAM_PREFIXES)
+
+    def _canonicalize_query(self, query: str) -> str:
+        """Return the canonical form of a query string: normalized and sorted parameters, without ignored ones."""
+        if self.exclude_url_params or not query:
+            return ""
+        params = [
+            normalize_percent_encoding(param, QUERY_SAFE_CHARACTERS)
+            for param in query.split("&") if param and not self._is_ignored_param(param)
+        ]
+        return "&".join(sorted(params))
+
+    def canonicalize(self, url: str) -> str:
+        """Return the canonical form of an absolute URL."""
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        netloc = (parts.hostname or "").rstrip(".")
+        if ":" in netloc:
+            netloc = f"[{netloc}]"  # IPv6
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        if port is not None and port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{netloc}:{port}"
+        if parts.username is not None:
+            credentials = parts.netloc.rsplit("@", 1)[0]
+            netloc = f"{credentials}@{netloc}"
+        path = normalize_percent_encoding(parts.path, PATH_SAFE_CHARACTERS).rstrip("/")
+        return urlunsplit((scheme, netloc, path, self._canonicalize_query(parts.query), ""))
+
+    def is_excluded(self, url: str) -> bool:
+        """Return True if a canonical URL must not be crawled ('exclude_pages' or 'exclude_patterns')."""
+        return self.exclusions.matches(url)
@@ -1,6 +1,30 @@
+import hashlib
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from time import time
+from urllib.parse import urlparse
+from uuid import uuid4
 
+import redis
 
-@dataclass
+from site_audit.audits import run_custom_audits
+from site_audit.canonical import URLCanonicalizer
+from site_audit.document import Document, parse_document
+from site_audit.fingerprints import FingerprintSet
+from site_audit.links import extract_links, resolve_links
+from site_audit.scheduler import get_url_partition
+
+# Empty mount points of the most common JS frameworks (React, Vue, Next.js, Nuxt, Angular...)
+SPA_ROOT_RE = re.compile(
+    r'<div[^>]*\sid=["\']?(?:root|app|__next|__nuxt|svelte)(?=["\'\s>])[^>]*>\s*</div>|<app-root[^>]*>\s*</app-root>',
+    re.IGNORECASE,
+)
+BODY_RE = re.compile(r"<body[^>]*>(.*?)(?:</body>|$)", re.IGNORECASE | re.DOTALL)
+NON_TEXT_RE = re.compile(r"<(script|style|noscript|template)[^>]*>.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+
+
+@dataclass(slots=True)
 class InternalLink:
     """
     Represents an internal link found in a webpage.
@@ -15,5 +39,323 @@ class InternalLink:
     from_page: str
     to_page: str
     anchor_text: str = ""
-    from_page_anchor_text: int = 0
+    from_page_depth: int = 0
+
+
+@dataclass
+class PageAnalysis:
+    """
+    The result of the analysis of a page HTML content, computed in a worker process (see 'analyze_page()').
+
+    Kwargs for initialization:
+    -------------------------
+      content_sha256 (str): The SHA-256 of the page content (and of its JS content if rendered with a browser).
+      links (list): The (URL, anchor text) of the internal links of the page (only the first link to each page).
+      scores (dict): The scores of the custom audits of the page ({audit name: score}).
+    """
+    content_sha256: str
+    links: list[tuple[str, str]] = field(default_factory=list)
+    scores: dict[str, float] = field(default_factory=dict)
+
+
+class Frontier:
+    """
+    Queue of URLs waiting to be crawled.
+
+    URLs are deduplicated when they are discovered, so a URL is only ever queued once: the URLs seen are only kept
+    as 64-bit fingerprints (see 'FingerprintSet'). The depth at which each URL was discovered is kept until it is
+    crawled ('done()'). URLs are popped in FIFO order, meaning pages are still crawled breadth-first.
+    """
+    # Whether other crawlers pop URLs from the same frontier
+    shared = False
+
+    def __init__(self):
+        self._queue = deque()
+        self._seen = FingerprintSet()
+        self._depths = {}
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._seen
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue a URL found at the given depth, return False if it has already been seen."""
+        if not self._seen.add(url):
+            return False
+        self._depths[url] = depth
+        self._queue.append(url)
+        return True
+
+    def pop(self) -> str | None:
+        """Return the next URL to crawl, None if there is none."""
+        return self._queue.popleft() if self._queue else None
+
+    def done(self, url: str) -> None:
+        """Mark a popped URL as crawled."""
+        self._depths.pop(url, None)
+
+    def is_finished(self) -> bool:
+        """Return True if no URL is left to crawl."""
+        return not self._queue
+
+    def depth_of(self, url: str) -> int:
+        """Return the depth at which a URL waiting to be crawled (or being crawled) has been discovered."""
+        return self._depths.get(url, 0)
+
+
+def get_redis_client() -> redis.Redis:
+    """Return a Redis client connected to 'settings.REDIS_HOST'."""
+    from django.conf import settings
+
+    return redis.Redis(host=settings.REDIS_HOST, port=int(settings.REDIS_PORT), password=settings.REDIS_PASSWORD)
+
+
+class RedisFrontier(Frontier):
+    """
+    Queue of URLs waiting to be crawled, stored in Redis and shared by all the crawlers of a website.
+
+    The queue is a sorted set scored by depth (crawled breadth-first), the hash of the depth of every URL ever
+    added deduplicates URLs. A popped URL is leased to its crawler until it is marked as crawled ('done()'): leases
+    of crawlers which died are expired after 'lease_timeout' seconds and their URLs queued again. Each lease holds
+    the token of its crawler ('token'), so a late crawler never releases the lease of the one crawling it again.
+    Every operation is a single atomic command or script, so any number of crawlers can pop from the same frontier.
+
+    Kwargs for initialization:
+    -------------------------
+      key (str): The prefix of the Redis keys of the frontier, e.g. the crawl it belongs to.
+      client (redis.Redis): The Redis client, connected to 'settings.REDIS_HOST' by default.
+      lease_timeout (int): The number of seconds a popped URL may take to be crawled before it is queued again.
+      expire_after (int): The number of seconds the frontier is kept in Redis after its last change.
+    """
+    shared = True
+
+    # KEYS: depths, queue | ARGV: url, depth
+    ADD_SCRIPT = """
+        if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+            return 0
+        end
+        redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+        return 1
+    """
+    # KEYS: queue, leases, owners | ARGV: lease expiration timestamp, token
+    POP_SCRIPT = """
+        local popped = redis.call('ZPOPMIN', KEYS[1])
+        if #popped == 0 then
+            return false
+        end
+        redis.call('ZADD', KEYS[2], ARGV[1], popped[1])
+        redis.call('HSET', KEYS[3], popped[1], ARGV[2])
+        return popped[1]
+    """
+    # KEYS: leases, owners | ARGV: url, token
+    DONE_SCRIPT = """
+        if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+            return 0
+        end
+        redis.call('ZREM', KEYS[1], ARGV[1])
+        redis.call('HDEL', KEYS[2], ARGV[1])
+        return 1
+    """
+    # KEYS: queue, leases, depths, owners | ARGV: current timestamp
+    REQUEUE_EXPIRED_SCRIPT = """
+        local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+        for _, url in ipairs(expired) do
+            redis.call('ZREM', KEYS[2], url)
+            redis.call('HDEL', KEYS[4], url)
+            redis.call('ZADD', KEYS[1], redis.call('HGET', KEYS[3], url), url)
+        end
+        return #expired
+    """
+
+    def __init__(self, key: str, client: redis.Redis = None, lease_timeout: int = 600, expire_after: int = 86400):
+        if client is None:
+            client = get_redis_client()
+        self.client = client
+        self.lease_timeout = lease_timeout
+        self.expire_after = expire_after
+        self.queue_key = f"frontier:{key}:queue"
+        self.leases_key = f"frontier:{key}:leases"
+        self.depths_key = f"frontier:{key}:depths"
+        self.owners_key = f"frontier:{key}:owners"
+        # Identifies the leases of this crawler
+        self.token = uuid4().hex
+        self._add = client.register_script(self.ADD_SCRIPT)
+        self._pop = client.register_script(self.POP_SCRIPT)
+        self._done = client.register_script(self.DONE_SCRIPT)
+        self._requeue_expired = client.register_script(self.REQUEUE_EXPIRED_SCRIPT)
+
+    def __len__(self) -> int:
+        return self.client.zcard(self.queue_key)
+
+    def __contains__(self, url: str) -> bool:
+        return bool(self.client.hexists(self.depths_key, url))
+
+    def _touch(self) -> None:
+        """Push back the expiration of the frontier, left behind by crawls which never finished."""
+        with self.client.pipeline(transaction=False) as pipeline:
+            for key in (self.queue_key, self.leases_key, self.depths_key, self.owners_key):
+                pipeline.expire(key, self.expire_after)
+            pipeline.execute()
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue a URL found at the given depth, return False if it has already been seen (by any crawler)."""
+        added = bool(self._add(keys=[self.depths_key, self.queue_key], args=[url, depth]))
+        if added:
+            self._touch()
+        return added
+
+    def pop(self) -> str | None:
+        """Lease the next URL to crawl, None if there is none."""
+        url = self._pop(
+            keys=[self.queue_key, self.leases_key, self.owners_key], args=[time() + self.lease_timeout, self.token]
+        )
+        return url.decode() if url is not None else None
+
+    def done(self, url: str) -> None:
+        """Mark a popped URL as crawled: release its lease, unless it expired and the URL was leased again since."""
+        self._done(keys=[self.leases_key, self.owners_key], args=[url, self.token])
+
+    def is_finished(self) -> bool:
+        """Return True if no URL is left to crawl and no crawler is crawling one (expired leases are queued again)."""
+        self._requeue_expired(
+            keys=[self.queue_key, self.leases_key, self.depths_key, self.owners_key], args=[time()]
+        )
+        with self.client.pipeline() as pipeline:
+            queued, leased = pipeline.zcard(self.queue_key).zcard(self.leases_key).execute()
+        return not queued and not leased
+
+    def depth_of(self, url: str) -> int:
+        """Return the depth at which a URL has been discovered."""
+        depth = self.client.hget(self.depths_key, url)
+        return int(depth) if depth is not None else 0
+
+    def clear(self) -> None:
+        """Delete the frontier from Redis."""
+        self.client.delete(self.queue_key, self.leases_key, self.depths_key, self.owners_key)
+
+
+class PartitionedFrontier(Frontier):
+    """
+    Queues of URLs waiting to be crawled, one per partition of a website, stored in Redis and shared by its shards.
+
+    Each URL is queued in the 'RedisFrontier' of its partition (see 'get_url_partition()'), whichever shard found it.
+    A shard pops the URLs of its own partition first, then the ones of the other partitions once its own is empty:
+    the pages of a shard which died are still crawled. The crawl is finished when every partition is.
+
+    Kwargs for initialization:
+    -------------------------
+      key (str): The prefix of the Redis keys of the frontiers, e.g. the crawl they belong to.
+      shard (int): The partition crawled first by this crawler.
+      shards (int): The number of partitions.
+      client (redis.Redis): The Redis client, connected to 'settings.REDIS_HOST' by default.
+      lease_timeout (int): The number of seconds a popped URL may take to be crawled before it is queued again.
+      expire_after (int): The number of seconds the frontiers are kept in Redis after their last change.
+    """
+    shared = True
+
+    def __init__(
+            self, key: str, shard: int, shards: int, client: redis.Redis = None, lease_timeout: int = 600,
+            expire_after: int = 86400
+    ):
+        client = client or get_redis_client()
+        self.shard = shard
+        self.partitions = [
+            RedisFrontier(f"{key}:{partition}", client, lease_timeout, expire_after) for partition in range(shards)
+        ]
 
+    def _get_partition(self, url: str) -> RedisFrontier:
+        """Return the frontier of the partition of a URL."""
+        return self.partitions[get_url_partition(url, len(self.partitions))]
+
+    def __len__(self) -> int:
+        return sum(len(partition) for partition in self.partitions)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._get_partition(url)
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue a URL in the frontier of its partition, return False if it has already been seen (by any shard)."""
+        return self._get_partition(url).add(url, depth)
+
+    def pop(self) -> str | None:
+        """Lease the next URL of the partition of this shard, else of the next partition with URLs left."""
+        shards = len(self.partitions)
+        for i in range(shards):
+            url = self.partitions[(self.shard + i) % shards].pop()
+            if url is not None:
+                return url
+        return None
+
+    def done(self, url: str) -> None:
+        """Mark a popped URL as crawled: release its lease."""
+        self._get_partition(url).done(url)
+
+    def is_finished(self) -> bool:
+        """Return True if no URL is left to crawl in any partition and no shard is crawling one."""
+        return all(partition.is_finished() for partition in self.partitions)
+
+    def depth_of(self, url: str) -> int:
+        """Return the depth at which a URL has been discovered."""
+        return self._get_partition(url).depth_of(url)
+
+    def clear(self) -> None:
+        """Delete the frontiers of all the partitions from Redis."""
+        for partition in self.partitions:
+            partition.clear()
+
+
+def looks_js_rendered(html: str, min_text_length: int = 200) -> bool:
+    """Return True if a page HTML (before JS execution) looks like it needs a browser to be rendered."""
+    body = BODY_RE.search(html)
+    body = body.group(1) if body else html
+    if SPA_ROOT_RE.search(body):
+        return True
+    text = NON_TEXT_RE.sub(" ", body)
+    return len(" ".join(text.split())) < min_text_length
+
+
+def get_internal_links(
+        html: str, url: str, domain: str, canonicalizer: URLCanonicalizer = None, document: Document = None
+) -> list[tuple[str, str]]:
+    """
+    Return the (canonical URL, anchor text) of the internal links found in a page HTML content.
+
+    Only the first link to each page is kept. If the page has already been parsed into a 'Document', its links are
+    read from it instead of parsing it again.
+    """
+    canonicalizer = canonicalizer or URLCanonicalizer()
+    if document is not None:
+        links = resolve_links(document.links, url, document.base_href)
+    else:
+        links = extract_links(html, url)
+    internal_links = {}
+    for href, anchor_text in links:
+        to_page = canonicalizer.canonicalize(href)
+        parsed_url = urlparse(to_page)
+        if parsed_url.hostname != domain or parsed_url.path.lower().endswith('.pdf'):
+            continue
+        if to_page not in internal_links:
+            internal_links[to_page] = anchor_text
+    return list(internal_links.items())
+
+
+def analyze_page(
+        url: str, html: str, domain: str, js_content: str = "", custom_audits: bool = True,
+        canonicalizer: URLCanonicalizer = None, base_url: str = None
+) -> PageAnalysis:
+    """
+    Hash a page, extract its internal links and run its custom audits.
+
+    This is the CPU-bound part of crawling a page: it only takes and returns plain (picklable) data so that it can
+    run in a process pool, without holding the GIL of the crawling threads. Relative links are resolved against
+    'base_url', the URL of the page after redirects ('url' by default). The page is parsed once: with custom audits,
+    links are read from the 'Document' they share.
+    """
+    document = parse_document(html) if custom_audits else None
+    return PageAnalysis(
+        content_sha256=hashlib.sha256(js_content.encode('utf-8') + html.encode('utf-8')).hexdigest(),
+        links=get_internal_links(html, base_url or url, domain, canonicalizer, document),
+        scores=run_custom_audits(url, html, document=document) if custom_audits else {},
+    )
@@ -0,0 +1,114 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from html import unescape
+
+from site_audit.links import TAG_RE
+
+# Single pass over the HTML: comments and doctypes are skipped, the content of <script>/<style> is not parsed
+TOKEN_RE = re.compile(
+    r"<!--.*?-->|<![^>]*>|<(script|style)\b([^>]*)>.*?</\1\s*>|<([a-zA-Z][\w:-]*)([^>]*)>|</([a-zA-Z][\w:-]*)\s*>",
+    re.DOTALL,
+)
+ATTRIBUTE_RE = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?""")
+HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+# Tags whose text content is indexed
+TEXT_TAGS = frozenset(("title", "a", *HEADINGS))
+
+
+def _parse_attributes(attributes: str) -> dict[str, str]:
+    """Return the attributes of a tag ({lowercase name: unescaped value}) from its raw attributes."""
+    if not attributes.strip(" /"):
+        return {}
+    return {
+        match.group(1).lower(): unescape(next((group for group in match.groups()[1:] if group is not None), ""))
+        for match in ATTRIBUTE_RE.finditer(attributes)
+    }
+
+
+def _get_text(html: str) -> str:
+    """Return the whitespace-normalized text of an HTML fragment, without its tags."""
+    return " ".join(unescape(TAG_RE.sub("", html)).split())
+
+
+@dataclass
+class Document:
+    """
+    Lightweight index of an HTML page, built in a single pass and shared by all the custom audits of the page.
+
+    Kwargs for initialization:
+    -------------------------
+      title (str): The text of the first <title> tag.
+      tags (dict): The attributes of every occurrence of each tag, by lowercase tag name.
+      headings (list): The (level, text) of every <h1>...<h6> tag, in document order.
+      meta (dict): The content of the <meta> tags, by lowercase 'name', 'property' or 'http-equiv'.
+      links (list): The (href, anchor text) of every <a href> tag, without anchor text if it is not closed.
+    """
+    title: str = ""
+    tags: dict[str, list[dict[str, str]]] = field(default_factory=lambda: defaultdict(list))
+    headings: list[tuple[int, str]] = field(default_factory=list)
+    meta: dict[str, str] = field(default_factory=dict)
+    links: list[tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def base_href(self) -> str | None:
+        """Return the href of the first <base> tag, None if there is none."""
+        return next((base["href"] for base in self.tags.get("base", []) if base.get("href")), None)
+
+    @property
+    def images(self) -> list[dict[str, str]]:
+        """Return the attributes of every <img> tag."""
+        return self.tags.get("img", [])
+
+    def count(self, tag: str) -> int:
+        """Return the number of occurrences of a tag."""
+        return len(self.tags.get(tag, []))
+
+    def get_headings(self, level: int) -> list[str]:
+        """Return the text of every heading of the given level (1 for <h1>...)."""
+        return [text for heading_level, text in self.headings if heading_level == level]
+
+
+def _add_link(document: Document, attributes: dict[str, str], text: str) -> None:
+    """Add a link to a document from the attributes of its <a> tag, if it has an href."""
+    if attributes.get("href"):
+        document.links.append((attributes["href"], text))
+
+
+def parse_document(html: str) -> Document:
+    """Parse a page HTML content into a 'Document' index, in a single pass whatever the number of audits."""
+    document = Document()
+    # Start offset of the content of each open tag whose text is indexed, with its attributes
+    open_tags = {}
+    for token in TOKEN_RE.finditer(html or ""):
+        raw_block, tag, closing_tag = token.group(1), token.group(3), token.group(5)
+        if raw_block is not None:
+            document.tags[raw_block.lower()].append(_parse_attributes(token.group(2)))
+        elif tag is not None:
+            tag = tag.lower()
+            attributes = _parse_attributes(token.group(4))
+            document.tags[tag].append(attributes)
+            if tag == "meta":
+                key = attributes.get("name") or attributes.get("property") or attributes.get("http-equiv")
+                if key and "content" in attributes:
+                    document.meta.setdefault(key.lower(), attributes["content"])
+            elif tag in TEXT_TAGS:
+                if tag == "a" and "a" in open_tags:
+                    # Unclosed <a>: the link is kept without anchor text
+                    _add_link(document, open_tags["a"][1], "")
+                open_tags[tag] = (token.end(), attributes)
+        elif closing_tag is not None:
+            closing_tag = closing_tag.lower()
+            if closing_tag not in open_tags:
+                continue
+            start, attributes = open_tags.pop(closing_tag)
+            text = _get_text(html[start:token.start()])
+            if closing_tag == "title":
+                document.title = document.title or text
+            elif closing_tag == "a":
+                _add_link(document, attributes, text)
+            else:
+                document.headings.append((int(closing_tag[1]), text))
+    if "a" in open_tags:
+        _add_link(document, open_tags["a"][1], "")
+    return document
@@ -1,3 +1,5 @@
+from functools import cache
+
 from django.db import models
 
 
@@ -21,10 +23,18 @@ class AuditChoices(models.TextChoices):
         5. The path to get value from the Google Page Speed Insights audit (json) | function to call to run the audit.
         6. A description of the audit.
     """
-    CRAWL_DEPTH = ("CRAWL_DEPTH", "seo", 0, 1, "site_audit.audits.crawl_depth", "The current crawl depth of the page.", "CRAWL_DEPTH")
+    # Computed from the internal links graph (path = metric name): pages seeded from sitemaps are not crawled at their actual depth
+    CRAWL_DEPTH = ("CRAWL_DEPTH", "seo", 0, 1, "crawl_depth", "The current crawl depth of the page: the minimum number of clicks needed to reach it from the home page.", "CRAWL_DEPTH")
     HAS_URL_ISSUES = ("HAS_URL_ISSUES",  "seo", 0, 1, "site_audit.audits.has_url_issues", "The crawled page has URL issues: non ascii char, params, space.", "HAS_URL_ISSUES")
     HAS_ONLY_ONE_H1 = ("HAS_ONLY_ONE_H1", "seo", 0, 1, "site_audit.audits.has_only_one_h1", "The crawled page has only one H1 tag.", "HAS_ONLY_ONE_H1")
 
+    # Site structure audits, computed from the internal links graph at the end of the crawl (path = metric name)
+    GRAPH_IN_DEGREE = ("GRAPH_IN_DEGREE", "seo", 0, 1, "in_degree", "The number of pages of the website linking to the page, relative to the most linked page.", "IN_DEGREE")
+    GRAPH_OUT_DEGREE = ("GRAPH_OUT_DEGREE", "seo", 0, 1, "out_degree", "The number of pages of the website the page links to, relative to the page with the most links.", "OUT_DEGREE")
+    GRAPH_HAS_INLINKS = ("GRAPH_HAS_INLINKS", "seo", 0, 1, "has_inlinks", "The page is linked from at least one other page of the website (0 means it is an orphan page).", "HAS_INLINKS")
+    GRAPH_CLICK_DEPTH = ("GRAPH_CLICK_DEPTH", "seo", 0, 1, "click_depth", "How close the page is to the home page: 1 / (1 + the minimum number of clicks needed to reach it).", "CLICK_DEPTH")
+    GRAPH_PAGERANK = ("GRAPH_PAGERANK", "seo", 0, 1, "pagerank", "The internal PageRank of the page, relative to the best ranked page of the website.", "PAGERANK")
+
     # Google Page Speed insights Performance metrics/audits
     PSI_PERFORMANCE_SCORE = ("PSI_PERFORMANCE_SCORE",  "perf", 0, 1, "categories.performance.score", "The Google Page Speed Insights performance score.", "PERFORMANCE_SCORE")
     PSI_FIRST_CONTENTFUL_PAINT = ("PSI_FIRST-CONTENTFUL-PAINT", "perf", 10, 1, "audits.first-contentful-paint.score", "First Contentful Paint marks the time at which the first text or image is painted. [Learn more about the First Contentful Paint metric](https://developer.chrome.com/docs/lighthouse/performance/first-contentful-paint/).", "FIRST_CONTENTFUL_PAINT")
@@ -191,14 +201,29 @@ class AuditChoices(models.TextChoices):
         obj.description = description
         return obj
 
+    # Lookups are cached: computed once per process, and returned as tuples so that callers can't alter them
     @classmethod
-    def get_psi_audits(cls) -> list:
-        """Return the list of PSI audits."""
-        return [cls(audit) for audit in cls.values if audit.startswith("PSI_")]
+    @cache
+    def get_psi_audits(cls) -> tuple:
+        """Return the PSI audits."""
+        return tuple(cls(audit) for audit in cls.values if audit.startswith("PSI_"))
 
     @classmethod
-    def get_custom_audits(cls) -> list:
-        """Return the list of custom audits."""
-        return [cls(audit) for audit in cls.values if not audit.startswith("PSI_")]
+    @cache
+    def get_custom_audits(cls) -> tuple:
+        """Return the custom audits (run on each page by the function at their path)."""
+        return tuple(cls(audit) for audit in cls.values if not audit.startswith("PSI_") and "." in cls(audit).path)
 
+    @classmethod
+    @cache
+    def get_graph_audits(cls) -> tuple:
+        """Return the site structure audits (computed from the internal links graph, their path is a metric name)."""
+        return tuple(cls(audit) for audit in cls.values if not audit.startswith("PSI_") and "." not in cls(audit).path)
+
+    @classmethod
+    @cache
+    def get_custom_audit_functions(cls) -> tuple:
+        """Return the (audit, function) of every custom audit, each function being imported from its path once."""
+        from commons.utils import import_from_str
 
+        return tuple((audit, import_from_str(audit.path)) for audit in cls.get_custom_audits())
@@ -0,0 +1,123 @@
+import re
+
+# Marks the end of a prefix in the trie (no URL character is an empty string)
+PREFIX_END = ""
+# Excluded pages ending with it exclude every URL they are a prefix of, e.g. "https://example.com/calendar/*"
+PREFIX_WILDCARD = "*"
+# Inline flags at the start of a pattern, which apply to the whole regex
+GLOBAL_FLAGS_RE = re.compile(r"\(\?([aiLmsux]+)\)")
+# '\1' or '(?(1)...)' after an even number of backslashes
+NUMBERED_BACKREFERENCE_RE = re.compile(r"(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\([0-9]+\))")
+
+
+def _scope_pattern(pattern: str) -> str:
+    """Return a pattern as a group which can be joined with others, its global inline flags (if any) scoped to it."""
+    flags = ""
+    while match := GLOBAL_FLAGS_RE.match(pattern):
+        flags += match.group(1)
+        pattern = pattern[match.end():]
+    if not flags:
+        return f"(?:{pattern})"
+    # A verbose pattern may end with a comment, which would swallow the closing parenthesis
+    end = "\n)" if "x" in flags else ")"
+    return f"(?{''.join(sorted(set(flags)))}:{pattern}{end}"
+
+
+def compile_patterns(patterns: list[str]) -> re.Pattern | None:
+    """
+    Return a single regex matching any of 'patterns' (searched in URLs), None without patterns.
+
+    Patterns are joined as groups: global inline flags ('(?i)...') only apply to their own pattern, and numbered
+    backreferences are refused as joined patterns are renumbered (named ones can be used instead). Raise a
+    ValueError if a pattern is invalid.
+    """
+    patterns = [pattern for pattern in patterns if pattern]
+    if not patterns:
+        return None
+    for pattern in patterns:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid exclude pattern {pattern!r}: {e}") from e
+        if NUMBERED_BACKREFERENCE_RE.search(pattern):
+            raise ValueError(
+                f"Invalid exclude pattern {pattern!r}: use named groups instead of numbered backreferences"
+            )
+    try:
+        return re.compile("|".join(_scope_pattern(pattern) for pattern in patterns))
+    except re.error as e:
+        raise ValueError(f"Invalid exclude patterns: {e}") from e
+
+
+class PrefixTrie:
+    """
+    Set of URL prefixes, stored as a character trie (nested dicts).
+
+    A URL is looked up in a single pass over its characters, whatever the number of prefixes.
+    """
+    def __init__(self, prefixes: list[str] = None):
+        self._root = {}
+        self._size = 0
+        for prefix in prefixes or []:
+            self.add(prefix)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, prefix: str) -> None:
+        """Add a prefix."""
+        node = self._root
+        for character in prefix:
+            node = node.setdefault(character, {})
+        if PREFIX_END not in node:
+            node[PREFIX_END] = True
+            self._size += 1
+
+    def matches(self, url: str) -> bool:
+        """Return True if the URL starts with any of the prefixes."""
+        node = self._root
+        if PREFIX_END in node:
+            return True
+        for character in url:
+            node = node.get(character)
+            if node is None:
+                return False
+            if PREFIX_END in node:
+                return True
+        return False
+
+
+class ExclusionMatcher:
+    """
+    Tell whether a URL must not be crawled, compiled once per crawl from the exclusion settings of a website.
+
+    Crawl traps (calendars, faceted search...) link to an endless number of pages: every link found is checked
+    before it is queued. Patterns are joined into a single regex (see 'compile_patterns()'), pages ending with '*'
+    are prefixes looked up in a 'PrefixTrie', other pages in a set. Matchers only hold plain data: they can be sent
+    to the processes analyzing pages.
+
+    Kwargs for initialization:
+    -------------------------
+      patterns (list): The patterns (re) of the URLs not to crawl, searched anywhere in URLs.
+      pages (list): The URLs not to crawl, or the prefix of the URLs not to crawl when they end with '*'.
+    """
+    def __init__(self, patterns: list[str] = None, pages: list[str] = None):
+        self.regex = compile_patterns(patterns or [])
+        self.pages = set()
+        self.prefixes = PrefixTrie()
+        for page in pages or []:
+            if page.endswith(PREFIX_WILDCARD):
+                self.prefixes.add(page[:-len(PREFIX_WILDCARD)])
+            else:
+                self.pages.add(page)
+
+    def __bool__(self) -> bool:
+        return bool(self.regex or self.pages or self.prefixes)
+
+    def matches(self, url: str) -> bool:
+        """Return True if the URL is excluded from the crawl."""
+        if url in self.pages:
+            return True
+        if self.prefixes and self.prefixes.matches(url):
+            return True
+        return self.regex is not None and self.regex.search(url) is not None
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+def _get_neighbors(nodes: np.ndarray, indptr: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Return the targets of all the links starting from 'nodes', in a CSR (indptr, targets) graph."""
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return targets[np.repeat(starts, lengths) + offsets]
+
+
+def _get_click_depths(root: int, indptr: np.ndarray, targets: np.ndarray, n: int) -> np.ndarray:
+    """Return the minimum number of clicks from the root page to each page (NaN if unreachable), level by level."""
+    depths = np.full(n, np.nan)
+    depths[root] = 0
+    level = np.array([root])
+    depth = 0
+    while level.size:
+        depth += 1
+        neighbors = _get_neighbors(level, indptr, targets)
+        level = np.unique(neighbors[np.isnan(depths[neighbors])])
+        depths[level] = depth
+    return depths
+
+
+def _get_pagerank(
+        sources: np.ndarray, targets: np.ndarray, out_degrees: np.ndarray, n: int,
+        damping: float = 0.85, max_iterations: int = 100, tolerance: float = 1e-10
+) -> np.ndarray:
+    """Return the PageRank of each page (summing to 1), computed by power iteration."""
+    ranks = np.full(n, 1 / n)
+    dangling = out_degrees == 0
+    weights = np.zeros(n)
+    weights[~dangling] = 1 / out_degrees[~dangling]
+    for _ in range(max_iterations):
+        # Pages without links share their rank with every page
+        inflow = np.bincount(targets, weights=ranks[sources] * weights[sources], minlength=n)
+        new_ranks = (1 - damping) / n + damping * (inflow + ranks[dangling].sum() / n)
+        converged = np.abs(new_ranks - ranks).sum() < tolerance
+        ranks = new_ranks
+        if converged:
+            break
+    return ranks
+
+
+def _scale_to_max(values: np.ndarray) -> np.ndarray:
+    """Return values divided by the highest one, so that they are between 0.0 and 1.0 (all 0.0 if none is positive)."""
+    highest = values.max() if values.size else 0
+    return values / highest if highest > 0 else np.zeros(values.size)
+
+
+def compute_link_metrics(pages: list[str], links: list[tuple[str, str]], root: str = None) -> dict[str, np.ndarray]:
+    """
+    Compute site-structure metrics of every page from the internal links graph of a website.
+
+    Links to pages missing from 'pages', self links and duplicated links are ignored. Metrics are scores between
+    0.0 and 1.0 (higher is better, like every audit score) but 'crawl_depth', returned arrays are in the same order
+    as 'pages':
+      - in_degree: the number of pages linking to the page, scaled so that the most linked page has 1.0.
+      - out_degree: the number of pages the page links to, scaled so that the page with the most links has 1.0.
+      - has_inlinks: 1.0 if at least one page links to the page, 0.0 for orphan pages (the root is never orphan).
+      - crawl_depth: the minimum number of clicks from the root page (NaN if unreachable).
+      - click_depth: 1 / (1 + crawl_depth), 1.0 for the root (NaN if unreachable).
+      - pagerank: the internal PageRank of the page, scaled so that the best page of the website has 1.0.
+    """
+    n = len(pages)
+    index = {url: i for i, url in enumerate(pages)}
+    sources = np.fromiter((index.get(from_page, -1) for from_page, _ in links), dtype=np.int64, count=len(links))
+    targets = np.fromiter((index.get(to_page, -1) for _, to_page in links), dtype=np.int64, count=len(links))
+    valid = (sources >= 0) & (targets >= 0) & (sources != targets)
+    edges = np.unique(sources[valid] * n + targets[valid])
+    sources, targets = edges // n, edges % n
+
+    in_degrees = np.bincount(targets, minlength=n)
+    out_degrees = np.bincount(sources, minlength=n)
+    has_inlinks = (in_degrees > 0).astype(float)
+    # Edges are sorted by source: they already are the CSR representation of the graph
+    indptr = np.concatenate(([0], np.cumsum(out_degrees)))
+    if root in index:
+        has_inlinks[index[root]] = 1.0
+        click_depths = _get_click_depths(index[root], indptr, targets, n)
+    else:
+        click_depths = np.full(n, np.nan)
+    pagerank = _get_pagerank(sources, targets, out_degrees, n) if n else np.zeros(0)
+
+    return {
+        "in_degree": _scale_to_max(in_degrees.astype(float)),
+        "out_degree": _scale_to_max(out_degrees.astype(float)),
+        "has_inlinks": has_inlinks,
+        "crawl_depth": click_depths,
+        "click_depth": 1 / (1 + click_depths),
+        "pagerank": _scale_to_max(pagerank),
+    }
@@ -0,0 +1,252 @@
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cache
+from time import monotonic, sleep
+from typing import Generator
+
+import httpx
+
+LIGHTHOUSE_COMMAND = [
+    "lighthouse",
+    "--quiet",
+    "--output=json",
+    "--disable-full-page-screenshot",
+]
+CHROME_FLAGS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--no-first-run",
+    "--no-default-browser-check",
+]
+PHASES = ("browser_start", "navigation", "audit", "json_parse")
+
+
+@cache
+def get_psi_getters() -> tuple:
+    """Return the (audit name, compiled report path) of every PSI audit, compiled once per process."""
+    from commons.utils import compile_nested_getter
+    from site_audit.enums import AuditChoices
+
+    return tuple((audit.value, compile_nested_getter(audit.path)) for audit in AuditChoices.get_psi_audits())
+
+
+@cache
+def get_lighthouse_filters() -> tuple:
+    """
+    Return the Lighthouse flags restricting a run to the categories and audits read by the PSI audits.
+
+    Lighthouse runs the union of '--only-categories' and '--only-audits': categories whose score is read are kept
+    whole (their score depends on all of their audits), other audits are run one by one.
+    """
+    from site_audit.enums import AuditChoices
+
+    categories, audits = [], []
+    for audit in AuditChoices.get_psi_audits():
+        section, name = audit.path.split(".")[:2]
+        names = categories if section == "categories" else audits
+        if name not in names:
+            names.append(name)
+    filters = []
+    if categories:
+        filters.append(f"--only-categories={','.join(categories)}")
+    if audits:
+        filters.append(f"--only-audits={','.join(audits)}")
+    return tuple(filters)
+
+
+def find_chrome() -> str:
+    """Return the path of the Chromium executable: $CHROME_PATH if set, else the one installed by Playwright."""
+    if os.environ.get("CHROME_PATH"):
+        return os.environ["CHROME_PATH"]
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as playwright:
+        return playwright.chromium.executable_path
+
+
+def _get_free_port() -> int:
+    """Return a TCP port currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LighthouseRunner:
+    """
+    Run Lighthouse audits against a persistent headless Chromium, reached through its remote debugging port.
+
+    Starting Chrome is a large part of the cost of a Lighthouse run: the browser is kept alive between audits and
+    only restarted every 'audits_per_browser' audits (or after a failure), in a fresh profile. Lighthouse already
+    opens a new tab and clears the storage and caches of the origin for each audit.
+    The seconds spent in each phase (see PHASES) are summed in 'timings'.
+
+    Kwargs for initialization:
+    -------------------------
+      timeout (int): The maximum duration of an audit in seconds, after which Lighthouse is killed.
+      audits_per_browser (int): The number of audits after which the browser is restarted.
+      chrome_path (str): The path of the Chromium executable (see 'find_chrome()' by default).
+    """
+    def __init__(self, timeout: int = 180, audits_per_browser: int = 20, chrome_path: str = None):
+        self.timeout = timeout
+        self.audits_per_browser = audits_per_browser
+        self.chrome_path = chrome_path
+        self.browser = None
+        self.port = None
+        self.profile_dir = None
+        self.browser_audits = 0
+        self.audits = 0
+        self.timings = {phase: 0.0 for phase in PHASES}
+
+    def start_browser(self, startup_timeout: int = 30) -> None:
+        """Launch Chromium with a remote debugging port and wait until its DevTools endpoint answers."""
+        started_at = monotonic()
+        self.chrome_path = self.chrome_path or find_chrome()
+        self.port = _get_free_port()
+        self.profile_dir = tempfile.mkdtemp(prefix="lighthouse-chrome-")
+        self.browser = subprocess.Popen(
+            [
+                self.chrome_path, *CHROME_FLAGS, f"--remote-debugging-port={self.port}",
+                f"--user-data-dir={self.profile_dir}", "about:blank"
+            ],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        self.browser_audits = 0
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{self.port}/json/version", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if self.browser.poll() is not None or monotonic() - started_at > startup_timeout:
+                    self.stop_browser()
+                    raise RuntimeError(f"Unable to start Chromium ({self.chrome_path})")
+                sleep(0.1)
+        self.timings["browser_start"] += monotonic() - started_at
+
+    def stop_browser(self) -> None:
+        """Kill the browser (and its child processes) and delete its profile."""
+        if self.browser is not None:
+            if self.browser.poll() is None:
+                os.killpg(self.browser.pid, signal.SIGKILL)
+            self.browser.wait()
+            self.browser = None
+        if self.profile_dir is not None:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def _get_port(self) -> int:
+        """Return the debugging port of the browser, (re)started if it is not running or has done enough audits."""
+        if self.browser is not None and (
+                self.browser_audits >= self.audits_per_browser or self.browser.poll() is not None
+        ):
+            self.stop_browser()
+        if self.browser is None:
+            self.start_browser()
+        self.browser_audits += 1
+        return self.port
+
+    def _add_report_timings(self, report: dict) -> None:
+        """Add the navigation and audit durations measured by Lighthouse itself ('timing.entries', in ms)."""
+        for entry in report.get("timing", {}).get("entries", []):
+            if entry.get("name") == "lh:driver:navigate":
+                self.timings["navigation"] += entry["duration"] / 1000
+            elif entry.get("name") == "lh:runner:audit":
+                self.timings["audit"] += entry["duration"] / 1000
+
+    def run(self, url: str) -> dict | None:
+        """Run Lighthouse on a URL and return its JSON report, None if it failed or took more than 'timeout' seconds."""
+        try:
+            port = self._get_port()
+        except RuntimeError as e:
+            print(f"Lighthouse failed on {url}: {e}")
+            return None
+        self.audits += 1
+        process = subprocess.Popen(
+            [*LIGHTHOUSE_COMMAND, *get_lighthouse_filters(), f"--port={port}", str(url)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True
+        )
+        try:
+            stdout, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.communicate()
+            # The page may still be loading in the browser: start from a clean one
+            self.stop_browser()
+            print(f"Lighthouse timed out after {self.timeout}s on: {url}")
+            return None
+        if process.returncode != 0 or not stdout:
+            self.stop_browser()
+            print(f"Lighthouse failed on {url}: {stderr}")
+            return None
+        parse_started_at = monotonic()
+        report = json.loads(stdout)
+        self.timings["json_parse"] += monotonic() - parse_started_at
+        self._add_report_timings(report)
+        return report
+
+    def close(self) -> None:
+        """Stop the browser."""
+        self.stop_browser()
+
+
+def get_available_cpus() -> int:
+    """Return the number of CPUs the current process may run on (the CPU count where the affinity is unknown)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def run_lighthouse_pool(
+        urls: list[str], max_workers: int = None, timeout: int = 180, audits_per_browser: int = 20
+) -> Generator[tuple[str, dict | None], None, None]:
+    """
+    Run Lighthouse on many URLs with a bounded number of concurrent processes (available CPUs by default).
+
+    Each worker thread audits its URLs with its own 'LighthouseRunner', i.e. its own persistent browser.
+    Yield a tuple (URL, JSON report or None) for each URL, as soon as its audit completes.
+    """
+    max_workers = max_workers or get_available_cpus()
+    tls = threading.local()
+    runners = []
+    runners_lock = threading.Lock()
+
+    def run(url: str) -> dict | None:
+        if not hasattr(tls, "runner"):
+            tls.runner = LighthouseRunner(timeout, audits_per_browser)
+            with runners_lock:
+                runners.append(tls.runner)
+        return tls.runner.run(url)
+
+    # Threads only wait for the Lighthouse and Chrome processes: the actual work happens in the subprocesses
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(run, url): url for url in urls}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    finally:
+        for runner in runners:
+            runner.close()
+        timings = {phase: round(sum(runner.timings[phase] for runner in runners), 2) for phase in PHASES}
+        print(f"Lighthouse: {sum(runner.audits for runner in runners)} audits, seconds per phase: {timings}")
+
+
+def extract_psi_scores(report: dict) -> dict[str, float]:
+    """Return the score of every PSI audit ({audit name: score}) from a Lighthouse JSON report."""
+    return {name: getter(report) for name, getter in get_psi_getters()}
+
+
+def iter_psi_scores(
+        urls: list[str], max_workers: int = None, timeout: int = 180, audits_per_browser: int = 20
+) -> Generator[tuple[str, dict], None, None]:
+    """Yield a tuple (URL, {audit name: score}) for each URL as soon as its audit completes (failed URLs skipped)."""
+    for url, report in run_lighthouse_pool(urls, max_workers, timeout, audits_per_browser):
+        if report is not None:
+            yield url, extract_psi_scores(report)
@@ -0,0 +1,111 @@
+import re
+from html import unescape
+from urllib.parse import urldefrag, urljoin
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+
+IGNORED_SCHEMES = ("mailto:", "tel:", "javascript:", "data:", "sms:", "ftp:")
+PARSER = "selectolax" if SelectolaxParser is not None else "lxml" if lxml_html is not None else "tokenizer"
+
+# Single pass over the HTML: comments and <script>/<style> blocks are skipped, <a>, </a> and <base> tags captured
+TOKEN_RE = re.compile(
+    r"<!--.*?-->|<(script|style)\b.*?</\1\s*>|<(a|base)\b([^>]*)>|</a\s*>", re.IGNORECASE | re.DOTALL
+)
+HREF_RE = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _get_href(attributes: str) -> str | None:
+    """Return the (unescaped) href of a tag from its raw attributes, None if it has no href."""
+    match = HREF_RE.search(attributes)
+    if match is None:
+        return None
+    return unescape(next(group for group in match.groups() if group is not None))
+
+
+def _parse_with_tokenizer(html: str) -> tuple:
+    """Return the <base> href and the (href, anchor text) of all links of a page, with a streaming tokenizer."""
+    base = None
+    links = []
+    anchor = None
+    for token in TOKEN_RE.finditer(html):
+        tag = token.group(2)
+        if tag is None:
+            if token.group(0)[1] == "/" and anchor is not None:
+                # </a>: the anchor text is everything since the opening tag, without the nested tags
+                links.append((anchor[0], unescape(TAG_RE.sub("", html[anchor[1]:token.start()]))))
+                anchor = None
+            continue
+        if anchor is not None:
+            # Unclosed <a> (or <base> inside it): keep the link without anchor text
+            links.append((anchor[0], ""))
+            anchor = None
+        href = _get_href(token.group(3))
+        if tag.lower() == "base":
+            base = base or href
+        elif href:
+            anchor = (href, token.end())
+    if anchor is not None:
+        links.append((anchor[0], ""))
+    return base, links
+
+
+def _parse_with_selectolax(html: str) -> tuple:
+    """Return the <base> href and the (href, anchor text) of all links of a page, parsed by selectolax."""
+    tree = SelectolaxParser(html)
+    base = tree.css_first("base[href]")
+    links = [(node.attributes.get("href"), node.text(deep=True)) for node in tree.css("a[href]")]
+    return base.attributes.get("href") if base else None, links
+
+
+def _parse_with_lxml(html: str) -> tuple:
+    """Return the <base> href and the (href, anchor text) of all links of a page, parsed by lxml."""
+    document = lxml_html.fromstring(html)
+    base = document.find(".//base[@href]")
+    links = [(link.get("href"), link.text_content()) for link in document.iter("a") if link.get("href")]
+    return base.get("href") if base is not None else None, links
+
+
+def parse_links(html: str) -> tuple:
+    """Return the <base> href and the (href, anchor text) of all links of a page, with the fastest parser available."""
+    if SelectolaxParser is not None:
+        return _parse_with_selectolax(html)
+    if lxml_html is not None and html.strip():
+        return _parse_with_lxml(html)
+    return _parse_with_tokenizer(html)
+
+
+def extract_links(html: str, page_url: str) -> list[tuple[str, str]]:
+    """
+    Return the absolute URL and anchor text of every link found in a page HTML content.
+
+    Hrefs are resolved against the page URL (or its <base> tag) with 'urljoin', fragments are removed, links to
+    non-web resources (mailto:, tel:, javascript:...) are skipped and anchor texts are whitespace-normalized.
+    """
+    if not html:
+        return []
+    base, links = parse_links(html)
+    return resolve_links(links, page_url, base)
+
+
+def resolve_links(links: list[tuple[str, str]], page_url: str, base: str = None) -> list[tuple[str, str]]:
+    """Return the absolute URL and anchor text of links parsed from a page (see 'extract_links()')."""
+    base_url = urljoin(page_url, base.strip()) if base else page_url
+    results = []
+    for href, text in links:
+        href = href.strip()
+        if not href or href.lower().startswith(IGNORED_SCHEMES):
+            continue
+        url = urldefrag(urljoin(base_url, href))[0]
+        if url.startswith(("http://", "https://")):
+            results.append((url, " ".join(text.split())))
+    return results
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("site_audit", "0002_dailycrawl_pages_crawled_alter_audit_name_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="page",
+            name="content_length",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="etag",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="last_modified",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="outlinks",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("site_audit", "0004_pagelink_and_graph_audits"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailysitemetric",
+            name="pages_audited",
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Latest score of every (page, audit) already audited: there is a single 'DailyPageAudit' per (page, audit, date)
+BACKFILL_LATEST_PAGE_AUDITS = """
+INSERT INTO site_audit_latestpageaudit (page_id, company_id, date, audit_score, audit_id)
+SELECT daily.page_id, daily.company_id, daily.date, daily.audit_score, daily.audit_id
+FROM site_audit_dailypageaudit daily
+INNER JOIN (
+    SELECT page_id, audit_id, MAX(date) AS date FROM site_audit_dailypageaudit GROUP BY page_id, audit_id
+) latest ON daily.page_id = latest.page_id AND daily.audit_id = latest.audit_id AND daily.date = latest.date
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_remove_company_address_remove_company_city_and_more"),
+        ("site_audit", "0005_dailysitemetric_pages_audited"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatestPageAudit",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("audit_score", models.FloatField(null=True)),
+                (
+                    "audit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="site_audit.audit",
+                    ),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="users.company"
+                    ),
+                ),
+                (
+                    "page",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="latest_audits",
+                        to="site_audit.page",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["company", "audit", "audit_score"],
+                        name="site_audit__company_94897e_idx",
+                    )
+                ],
+                "unique_together": {("page", "audit")},
+            },
+        ),
+        migrations.RunSQL(BACKFILL_LATEST_PAGE_AUDITS, migrations.RunSQL.noop),
+    ]
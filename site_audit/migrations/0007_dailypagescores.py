@@ -0,0 +1,53 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_remove_company_address_remove_company_city_and_more"),
+        ("site_audit", "0006_latestpageaudit"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyPageScores",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(db_index=True)),
+                ("scores", models.JSONField(default=dict)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="users.company"
+                    ),
+                ),
+                (
+                    "page",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_scores",
+                        to="site_audit.page",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["company", "date"],
+                        name="site_audit__company_4dadbe_idx",
+                    )
+                ],
+                "unique_together": {("page", "date")},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("site_audit", "0007_dailypagescores"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailypsiaudit",
+            name="pages_done",
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -1,8 +1,13 @@
+from collections import defaultdict
 from datetime import timedelta, datetime
 
+from django.conf import settings
 from django.db import models
-from django.db.models import Sum, F
+from django.db.models import Avg, Count, F, FloatField, Sum
+from django.db.models.fields.json import KeyTransform
+from django.db.models.functions import NullIf
 
+from commons.utils import bulk_upsert
 from site_audit.enums import AuditChoices, CrawlStatus
 from users.models import Company
 
@@ -28,6 +33,8 @@ class DailyPsiAudit(models.Model):
     finished_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=50, choices=CrawlStatus.choices, default=CrawlStatus.RUNNING)
     pages_audited = models.IntegerField(default=0)
+    # Number of pages whose scores are saved so far (progress of the run)
+    pages_done = models.IntegerField(default=0)
 
     @property
     def duration(self) -> timedelta:
@@ -43,6 +50,12 @@ class Page(models.Model):
     last_crawl_at = models.DateTimeField(auto_now=True)
     content_sha256 = models.CharField(max_length=64)
     company = models.ForeignKey("users.Company", on_delete=models.CASCADE)
+    # HTTP validators of the last crawl, sent back as conditional request headers on the next one
+    etag = models.CharField(max_length=255, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    content_length = models.IntegerField(null=True, blank=True)
+    # Internal links found on the page: [[URL, anchor text], ...], reused when the page has not changed
+    outlinks = models.JSONField(default=list, blank=True)
 
     class Meta:
         unique_together = ("company", "url")
@@ -62,6 +75,23 @@ class Page(models.Model):
         return hash(self.url)
 
 
+class PageLink(models.Model):
+    """
+    Represents an internal link between two pages of a website, found during the last crawl.
+
+    The table only holds the links graph of the last crawl of each website: it is replaced after every crawl.
+    """
+    company = models.ForeignKey("users.Company", on_delete=models.CASCADE)
+    from_page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name="links_from")
+    to_page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name="links_to")
+    anchor_text = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "to_page"]),
+        ]
+
+
 class Audit(models.Model):
     """
     Represents a test executed on each webpage.
@@ -96,18 +126,213 @@ class DailyPageAudit(models.Model):
 
     @classmethod
     def get_daily_category_avg(cls, for_company: Company = None, category: str = None):
-        """Get the current daily score average for a given website (company), on a chosen audit category."""
+        """
+        Get the current daily score average for a given website (company), on a chosen audit category.
+
+        Pages are only re-audited when they change: the average is computed on the latest known score of every page
+        (see 'LatestPageAudit'), not only on the pages audited today.
+        """
         if for_company is None:
             raise ValueError("'for_company' kwargs is required.")
 
-        today = datetime.now().strftime("%m-%d-%Y")
-        return cls.objects.filter(
-            company=for_company, date=today, audit__category=category
+        return LatestPageAudit.objects.filter(
+            company=for_company, audit__category=category
         ).aggregate(
             avg=Sum(F('audit__category_weight') * F('audit_score')) / Sum('audit__category_weight')
         )["avg"]
 
 
+class LatestPageAudit(models.Model):
+    """
+    Represents the latest known audit value of a webpage.
+
+    Unchanged pages are not re-audited, so they have no 'DailyPageAudit' on most days: their scores are carried
+    forward in this table, where only the rows of re-audited pages are updated.
+    """
+    page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name="latest_audits")
+    company = models.ForeignKey("users.Company", on_delete=models.CASCADE)
+    # Date of the 'DailyPageAudit' the score comes from
+    date = models.DateField()
+    audit_score = models.FloatField(null=True)
+    audit = models.ForeignKey(Audit, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ("page", "audit")
+        indexes = [
+            models.Index(fields=["company", "audit", "audit_score"]),
+        ]
+
+    @classmethod
+    def update_from(cls, page_audits: list[DailyPageAudit]) -> None:
+        """Upsert the latest scores of the pages and audits of new 'DailyPageAudit' objects."""
+        bulk_upsert(
+            cls,
+            [
+                cls(
+                    page_id=page_audit.page_id,
+                    company_id=page_audit.company_id,
+                    date=page_audit.date,
+                    audit_score=page_audit.audit_score,
+                    audit_id=page_audit.audit_id,
+                )
+                for page_audit in page_audits
+            ],
+            unique_fields=["page", "audit"],
+            update_fields=["date", "audit_score"],
+        )
+
+
+class DailyPageScores(models.Model):
+    """
+    Represents all the daily audit values of a webpage: the compact layout of 'DailyPageAudit'.
+
+    A single row per page per day holds the scores of all audits ({audit name: score}), instead of one row per
+    page, audit and day. It is used instead of 'DailyPageAudit' when 'settings.SITE_AUDIT_COMPACT_STORAGE' is set.
+    Existing 'DailyPageAudit' rows are converted with 'compact()', and old rows of both layouts are deleted by
+    'purge()' according to 'settings.SITE_AUDIT_RETENTION_DAYS'.
+    """
+    page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name="daily_scores")
+    company = models.ForeignKey("users.Company", on_delete=models.CASCADE)
+    date = models.DateField(db_index=True)
+    scores = models.JSONField(default=dict)
+
+    class Meta:
+        unique_together = ("page", "date")
+        indexes = [
+            models.Index(fields=["company", "date"]),
+        ]
+
+    @classmethod
+    def save_page_audits(cls, page_audits: list[DailyPageAudit], batch_size: int = 1024) -> None:
+        """
+        Save 'DailyPageAudit' objects in the compact layout.
+
+        Scores are merged with the ones already saved for the same page and day (e.g. PSI audits saved after the
+        custom audits of the crawl). On PostgreSQL, they are merged by the upsert itself, so concurrent writers (e.g.
+        two shards crawling the same page) don't overwrite each other's scores.
+        """
+        from django.db import connections, router
+
+        rows = {}
+        for page_audit in page_audits:
+            key = (page_audit.page_id, page_audit.date)
+            if key not in rows:
+                rows[key] = cls(
+                    page_id=page_audit.page_id, company_id=page_audit.company_id, date=page_audit.date, scores={}
+                )
+            rows[key].scores[page_audit.audit_id] = page_audit.audit_score
+        rows = list(rows.values())
+        if connections[router.db_for_write(cls)].vendor == "postgresql":
+            bulk_upsert(
+                cls, rows, unique_fields=["page", "date"], update_fields=["scores"], merge_fields=["scores"],
+                batch_size=batch_size
+            )
+            return
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            existing = defaultdict(dict)
+            for page_id, date, scores in cls.objects.filter(
+                    page_id__in={row.page_id for row in batch}, date__in={row.date for row in batch}
+            ).values_list("page_id", "date", "scores"):
+                existing[(page_id, date)] = scores
+            for row in batch:
+                row.scores = {**existing[(row.page_id, row.date)], **row.scores}
+            bulk_upsert(cls, batch, unique_fields=["page", "date"], update_fields=["scores"])
+
+    @classmethod
+    def get_scores(cls, for_company: Company = None, date=None) -> dict[str, dict[str, float]]:
+        """Return the scores of all the pages of a website on a day (today by default): {url: {audit name: score}}."""
+        if for_company is None:
+            raise ValueError("'for_company' kwargs is required.")
+
+        return dict(
+            cls.objects.filter(company=for_company, date=date or datetime.now().date()).values_list("page_id", "scores")
+        )
+
+    @classmethod
+    def get_audit_scores(cls, for_company: Company = None, audit: str = None, date=None) -> dict[str, float]:
+        """Return the scores of an audit for all the pages of a website on a day (today by default): {url: score}."""
+        if for_company is None:
+            raise ValueError("'for_company' kwargs is required.")
+
+        return dict(
+            cls.objects.filter(
+                company=for_company, date=date or datetime.now().date(), scores__has_key=audit
+            ).annotate(score=KeyTransform(audit, "scores")).values_list("page_id", "score")
+        )
+
+    def to_page_audits(self) -> list[DailyPageAudit]:
+        """Return the scores of the row as (unsaved) 'DailyPageAudit' objects, i.e. in the default layout."""
+        return [
+            DailyPageAudit(
+                page_id=self.page_id, company_id=self.company_id, date=self.date, audit_id=audit_id, audit_score=score
+            )
+            for audit_id, score in self.scores.items()
+        ]
+
+    @classmethod
+    def compact(cls, for_company: Company = None, before=None, batch_size: int = 10000) -> int:
+        """
+        Convert the 'DailyPageAudit' rows of a website (all websites by default) into the compact layout.
+
+        Only rows older than 'before' are converted (all of them by default). Converted rows are deleted, day by day,
+        so the conversion can be stopped and resumed. Return the number of 'DailyPageAudit' rows converted.
+        """
+        page_audits = DailyPageAudit.objects.all()
+        if for_company is not None:
+            page_audits = page_audits.filter(company=for_company)
+        if before is not None:
+            page_audits = page_audits.filter(date__lt=before)
+        converted = 0
+        for date in page_audits.order_by("date").values_list("date", flat=True).distinct():
+            day_audits = page_audits.filter(date=date)
+            batch = []
+            for page_audit in day_audits.only("page", "company", "date", "audit", "audit_score").iterator(
+                    chunk_size=batch_size
+            ):
+                batch.append(page_audit)
+                if len(batch) >= batch_size:
+                    cls.save_page_audits(batch)
+                    converted += len(batch)
+                    batch = []
+            cls.save_page_audits(batch)
+            converted += len(batch)
+            day_audits.delete()
+        return converted
+
+    @classmethod
+    def purge(cls, retention_days: int = None) -> tuple[int, int]:
+        """
+        Delete the daily audits of both layouts older than 'retention_days' days, and return the rows deleted in each.
+
+        'settings.SITE_AUDIT_RETENTION_DAYS' is used by default, nothing is deleted if it is not set. Site averages
+        ('DailySiteMetric') and latest scores ('LatestPageAudit') are kept.
+        """
+        retention_days = retention_days or getattr(settings, "SITE_AUDIT_RETENTION_DAYS", None)
+        if not retention_days:
+            return 0, 0
+        before = datetime.now().date() - timedelta(days=retention_days)
+        deleted_page_audits, _ = DailyPageAudit.objects.filter(date__lt=before).delete()
+        deleted_page_scores, _ = cls.objects.filter(date__lt=before).delete()
+        return deleted_page_audits, deleted_page_scores
+
+
+def save_daily_page_audits(page_audits: list[DailyPageAudit]) -> None:
+    """
+    Save new daily audits and update the latest scores of their pages ('LatestPageAudit').
+
+    Daily audits are saved in the layout chosen by 'settings.SITE_AUDIT_COMPACT_STORAGE'.
+    """
+    if getattr(settings, "SITE_AUDIT_COMPACT_STORAGE", False):
+        DailyPageScores.save_page_audits(page_audits)
+    else:
+        # A page audited twice the same day keeps its last score
+        bulk_upsert(
+            DailyPageAudit, page_audits, unique_fields=["page", "audit", "date"], update_fields=["audit_score"]
+        )
+    LatestPageAudit.update_from(page_audits)
+
+
 class DailySiteMetric(models.Model):
     """
     Represents a daily metric record for the whole website (average).
@@ -118,9 +343,64 @@ class DailySiteMetric(models.Model):
     date = models.DateField(db_index=True)
     audit_avg_score = models.FloatField(null=True)
     audit = models.ForeignKey(Audit, on_delete=models.CASCADE)
+    # Number of page scores averaged, to weight the audit when averaging a whole category
+    pages_audited = models.IntegerField(default=0)
 
     class Meta:
         unique_together = ("company", "audit", "date")
         indexes = [
             models.Index(fields=["company", "date", "audit", "audit_avg_score"]),
-        ]
\ No newline at end of file
+        ]
+
+    @classmethod
+    def aggregate(cls, for_company: Company = None, date=None, audits: list[str] = None) -> int:
+        """
+        Compute the site average of each audit from the latest scores of all pages, and upsert them for the day.
+
+        All averages are computed in a single grouped query over 'LatestPageAudit', so pages not re-audited today
+        still count. Only the given audits are recomputed (all of them by default): after a partial re-audit, the
+        rows of the other audits are left untouched.
+        Return the number of rows upserted.
+        """
+        if for_company is None:
+            raise ValueError("'for_company' kwargs is required.")
+
+        date = date or datetime.now().date()
+        page_audits = LatestPageAudit.objects.filter(company=for_company)
+        if audits is not None:
+            page_audits = page_audits.filter(audit_id__in=list(audits))
+        metrics = [
+            cls(
+                company_id=getattr(for_company, "pk", for_company),
+                date=date,
+                audit_id=row["audit_id"],
+                audit_avg_score=row["avg"],
+                pages_audited=row["count"],
+            )
+            for row in page_audits.values("audit_id").annotate(avg=Avg("audit_score"), count=Count("audit_score"))
+        ]
+        cls.objects.bulk_create(
+            metrics,
+            1024,
+            update_conflicts=True,
+            update_fields=["audit_avg_score", "pages_audited"],
+            unique_fields=["company", "audit", "date"],
+        )
+        return len(metrics)
+
+    @classmethod
+    def get_daily_category_avg(cls, for_company: Company = None, category: str = None, date=None):
+        """
+        Get the daily score average for a given website (company), on a chosen audit category (today by default).
+
+        Read from the precomputed audit averages (see 'aggregate()'), one row per audit instead of one per page and
+        audit. Each audit average is weighted by its category weight and by its number of scored pages.
+        """
+        if for_company is None:
+            raise ValueError("'for_company' kwargs is required.")
+
+        weight = F("audit__category_weight") * F("pages_audited")
+        weighted_scores = Sum(weight * F("audit_avg_score"), output_field=FloatField())
+        return cls.objects.filter(
+            company=for_company, date=date or datetime.now().date(), audit__category=category
+        ).aggregate(avg=weighted_scores / NullIf(Sum(weight, output_field=FloatField()), 0.0))["avg"]
\ No newline at end of file
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from time import monotonic, sleep
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    A token bucket allowing 'rate' requests per second, with bursts of up to 'capacity' requests.
+
+    Tokens are reserved rather than waited for: the bucket can go into debt, and each caller is told how long to
+    wait before its token is actually available. Concurrent callers are therefore spaced exactly 1/rate apart.
+    """
+    def __init__(self, rate: float, capacity: int = 1):
+        if rate <= 0:
+            raise ValueError("'rate' must be a positive number of requests per second.")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token from the bucket and return the number of seconds to wait before using it."""
+        with self._lock:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class HostState:
+    """Politeness state (rate limit, concurrency cap and stats) of a single host."""
+    def __init__(self, rate: float, burst: int, max_concurrent: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = threading.BoundedSemaphore(max_concurrent)
+        # Created lazily, as it must be bound to the event loop of the crawl
+        self.async_semaphore = None
+        self.requests = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserve the next request to the host and return the number of seconds to wait before sending it."""
+        delay = self.bucket.reserve()
+        with self._lock:
+            self.requests += 1
+            self.waited += delay
+        return delay
+
+
+class HostScheduler:
+    """
+    Politeness layer keyed by host, limiting both the request rate and the number of concurrent requests.
+
+    Kwargs for initialization:
+    -------------------------
+      requests_per_second (float): The maximum number of requests per second sent to a host.
+      max_concurrent_per_host (int): The maximum number of requests in flight to a host.
+      burst (int): The number of requests that can be sent at once after a host has been idle.
+    """
+    def __init__(self, requests_per_second: float = 2.0, max_concurrent_per_host: int = 5, burst: int = 1):
+        self.requests_per_second = requests_per_second
+        self.max_concurrent_per_host = max_concurrent_per_host
+        self.burst = burst
+        self.crawl_delays = {}
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def set_crawl_delay(self, host: str, delay: float) -> None:
+        """Honor a 'Crawl-delay' (in seconds) for the given host: at most one request every 'delay' seconds."""
+        with self._lock:
+            self.crawl_delays[host] = delay
+            self.hosts.pop(host, None)
+
+    def get_host(self, url: str) -> HostState:
+        """Return the politeness state of the host of a URL (created on first use)."""
+        host = urlparse(url).hostname
+        with self._lock:
+            if host not in self.hosts:
+                rate, burst = self.requests_per_second, self.burst
+                delay = self.crawl_delays.get(host)
+                if delay:
+                    rate, burst = min(rate, 1 / delay), 1
+                self.hosts[host] = HostState(rate, burst, self.max_concurrent_per_host)
+            return self.hosts[host]
+
+    @contextmanager
+    def slot(self, url: str):
+        """Block until a request to the URL host is allowed, and hold one of its concurrency slots meanwhile."""
+        state = self.get_host(url)
+        with state.semaphore:
+            delay = state.reserve()
+            if delay > 0:
+                sleep(delay)
+            yield
+
+    @asynccontextmanager
+    async def async_slot(self, url: str):
+        """Wait for a slot like 'slot()', without blocking the event loop."""
+        state = self.get_host(url)
+        if state.async_semaphore is None:
+            state.async_semaphore = asyncio.Semaphore(self.max_concurrent_per_host)
+        async with state.async_semaphore:
+            delay = state.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+
+    def stats(self) -> dict:
+        """Return the number of requests sent and the seconds spent waiting, per host."""
+        return {
+            host: {"requests": state.requests, "waited": round(state.waited, 2)} for host, state in self.hosts.items()
+        }
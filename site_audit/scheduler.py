@@ -0,0 +1,90 @@
+import math
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+from site_audit.fingerprints import get_url_fingerprint
+
+# Read at import: Modal needs them to declare the functions (concurrency limits), before Django is set up
+MAX_CONCURRENT_CRAWLS = int(os.environ.get("SITE_AUDIT_MAX_CONCURRENT_CRAWLS", 10))
+MAX_LIGHTHOUSE_CONTAINERS = int(os.environ.get("SITE_AUDIT_MAX_LIGHTHOUSE_CONTAINERS", 5))
+# CPUs reserved for each container running Lighthouse, which runs one audit per CPU
+LIGHTHOUSE_CPUS = int(os.environ.get("SITE_AUDIT_LIGHTHOUSE_CPUS", 4))
+# Sites are split in 'ceil(pages / PAGES_PER_SHARD)' shards (at most MAX_SHARDS), crawled in separate containers
+PAGES_PER_SHARD = int(os.environ.get("SITE_AUDIT_PAGES_PER_SHARD", 5000))
+MAX_SHARDS = int(os.environ.get("SITE_AUDIT_MAX_SHARDS", 8))
+# PSI audits of 'ceil(urls / PSI_URLS_PER_CONTAINER)' containers (at most MAX_LIGHTHOUSE_CONTAINERS) per run
+PSI_URLS_PER_CONTAINER = int(os.environ.get("SITE_AUDIT_PSI_URLS_PER_CONTAINER", 500))
+
+
+@dataclass
+class CrawlJob:
+    """
+    Represents the scheduled crawl of a website.
+
+    Kwargs for initialization:
+    -------------------------
+      company_id (int): The company whose website is crawled.
+      pages (int): The number of pages found by the previous crawl.
+      last_change_at (datetime): When changed pages were last found (PSI audits run), None if never.
+      shards (int): The number of partitions of the URLs of the website, crawled in separate containers.
+    """
+    company_id: int
+    pages: int = 0
+    last_change_at: datetime = None
+    shards: int = 1
+
+
+def get_url_partition(url: str, partitions: int) -> int:
+    """Return the partition of a URL, among 'partitions', from its fingerprint (stable across processes)."""
+    return get_url_fingerprint(url) % partitions
+
+
+def get_shards_count(pages: int) -> int:
+    """Return the number of shards a website of 'pages' pages is crawled in."""
+    return max(1, min(math.ceil(pages / PAGES_PER_SHARD), MAX_SHARDS))
+
+
+def get_psi_containers_count(urls: int) -> int:
+    """Return the number of containers running the PSI audits of 'urls' urls."""
+    return max(1, min(math.ceil(urls / PSI_URLS_PER_CONTAINER), MAX_LIGHTHOUSE_CONTAINERS))
+
+
+def get_crawl_schedule() -> list[CrawlJob]:
+    """
+    Return the crawls of every website, in the order they must start.
+
+    Websites never crawled come first, then the largest ones (by number of shards), so that they don't finish last.
+    Among websites of the same size, the ones changed most recently come first: they are the most likely to have
+    changed again.
+    """
+    from django.db.models import Count, IntegerField, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+    from site_audit.models import DailyPsiAudit, Page
+    from users.models import Company
+
+    # Correlated subqueries: joining both tables would multiply the pages of a company by its PSI runs
+    pages = (
+        Page.objects.filter(company_id=OuterRef("pk")).order_by().values("company_id")
+        .annotate(count=Count("pk")).values("count")
+    )
+    last_change_at = (
+        DailyPsiAudit.objects.filter(company_id=OuterRef("pk"), pages_audited__gt=0)
+        .order_by("-started_at").values("started_at")[:1]
+    )
+    companies = Company.objects.annotate(
+        pages=Coalesce(Subquery(pages, output_field=IntegerField()), 0),
+        last_change_at=Subquery(last_change_at),
+    ).values_list("id", "pages", "last_change_at")
+    jobs = [
+        CrawlJob(company_id=company_id, pages=pages, last_change_at=last_change_at, shards=get_shards_count(pages))
+        for company_id, pages, last_change_at in companies
+    ]
+    return sorted(
+        jobs,
+        key=lambda job: (
+            job.pages > 0,
+            -job.shards,
+            -job.last_change_at.timestamp() if job.last_change_at else math.inf,
+        ),
+    )
@@ -0,0 +1,72 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Generator, Iterable
+from xml.etree import ElementTree
+
+import httpx
+
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+SITEMAP_NAMESPACE = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+# The <loc> of an entry, with or without the sitemap namespace: the ones of extensions (<image:loc>...) are skipped
+LOC_TAGS = (f"{SITEMAP_NAMESPACE}loc", "loc")
+
+
+def parse_sitemap(chunks: Iterable[bytes]) -> Generator[tuple[str, str], None, None]:
+    """
+    Stream-parse a sitemap (urlset) or a sitemap index, gzipped or not, from chunks of bytes.
+
+    Yield a tuple for each entry: ("url", page URL) in a urlset, ("sitemap", sitemap URL) in a sitemap index. The
+    URL of an entry is its first sitemap <loc>, not the ones of images or videos. Parsed entries are cleared right away, so memory stays flat whatever the size of the sitemap.
+    """
+    parser = ElementTree.XMLPullParser(events=("end",))
+    decompressor = None
+    first_chunk = True
+    loc = None
+    for chunk in chunks:
+        if first_chunk:
+            if chunk.startswith(GZIP_MAGIC_NUMBER):
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            first_chunk = False
+        parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+        for _, element in parser.read_events():
+            if element.tag in LOC_TAGS:
+                loc = loc or (element.text or "").strip()
+                continue
+            tag = element.tag.removeprefix(SITEMAP_NAMESPACE)
+            if tag in ("url", "sitemap"):
+                if loc:
+                    yield tag, loc
+                loc = None
+                element.clear()
+
+
+def fetch_sitemap(client: httpx.Client, url: str) -> tuple[list[str], list[str]]:
+    """Return the page URLs and the nested sitemap URLs listed in a sitemap (both empty if it can't be fetched)."""
+    pages, sitemaps = [], []
+    try:
+        with client.stream("GET", url) as response:
+            if response.is_error:
+                return pages, sitemaps
+            for tag, loc in parse_sitemap(response.iter_bytes()):
+                (pages if tag == "url" else sitemaps).append(loc)
+    except Exception as e:
+        print(f"Unable to read sitemap '{url}': {e}")
+    return pages, sitemaps
+
+
+def fetch_sitemaps_urls(
+        client: httpx.Client, sitemaps: list[str], max_workers: int = 5
+) -> Generator[str, None, None]:
+    """Yield the page URLs listed in sitemaps and in every sitemap they reference, fetched in parallel."""
+    seen = set(sitemaps)
+    pending = list(seen)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending:
+            nested_sitemaps = []
+            for pages, sitemaps in pool.map(lambda url: fetch_sitemap(client, url), pending):
+                yield from pages
+                for sitemap in sitemaps:
+                    if sitemap not in seen:
+                        seen.add(sitemap)
+                        nested_sitemaps.append(sitemap)
+            pending = nested_sitemaps
@@ -1,19 +1,34 @@
-import hashlib
+import asyncio
+import multiprocessing
+import os
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime
-from random import randint
+from functools import partial
 from time import sleep
+from urllib.parse import urlparse
 
+from playwright.async_api import async_playwright
 from playwright.sync_api import sync_playwright, Route
-from typing import Generator
-
-from bs4 import BeautifulSoup
 
 import django
+import httpx
 import modal
 from modal import Image
 
+from commons.async_retry import RetryInfo, retry
+from site_audit.canonical import URLCanonicalizer
+from site_audit.crawlers import (
+    Frontier, InternalLink, PageAnalysis, PartitionedFrontier, RedisFrontier, analyze_page, looks_js_rendered
+)
+from site_audit.fingerprints import FingerprintSet
+from site_audit.graph import compute_link_metrics
+from site_audit.politeness import HostScheduler
+from site_audit.scheduler import (
+    LIGHTHOUSE_CPUS, MAX_CONCURRENT_CRAWLS, MAX_LIGHTHOUSE_CONTAINERS, get_crawl_schedule, get_psi_containers_count,
+    get_url_partition
+)
+from site_audit.sitemaps import fetch_sitemaps_urls
 
 site_audit = modal.App("site_audit")
 django_app_image = (
@@ -41,119 +56,340 @@ class Crawler:
     Kwargs for initialization:
     -------------------------
       website (str): The website to crawl.
+      known_pages (dict): The pages saved by the previous crawl ({url: Page}), to only download changed pages.
       user_agent (str): The user agent to use when making requests to the website.
       exclude_patterns (list): A list of patterns (re) of pages not to crawl.
-      exclude_pages (list): A list of specific pages not to crawl.
-      exclude_url_params (bool): Whether to exclude URL parameters when checking if a page has already been crawled.
+      exclude_pages (list): A list of specific pages not to crawl, or of URL prefixes when they end with '*'. Excluded
+        pages are never queued (see 'ExclusionMatcher').
+      exclude_url_params (bool): Whether to remove the whole query string of URLs: pages only differing by their
+        query parameters are crawled once. Tracking parameters are always removed, as URLs are canonicalized when
+        they are discovered (see 'URLCanonicalizer').
       timeout (int): The timeout in seconds waiting for page to load fully.
       max_concurrent_requests (int): The maximum number of concurrent requests to make to the website.
+      pages_per_browser (int): The number of pages a worker's browser renders before being recycled.
+      requests_per_second (float): The maximum number of requests per second sent to the website.
+      max_concurrent_requests_per_host (int): The maximum number of requests in flight to a single host.
+      fetch_strategy (str): How pages are fetched, one of:
+        - "browser": always render pages with Chromium (Playwright).
+        - "http": only download the HTML with a pooled HTTP client, JS is never executed.
+        - "auto": download the HTML, and only render it with Chromium if it looks JS-rendered.
+      use_sitemaps (bool): Whether to seed the crawl with the pages listed in the sitemaps of the website.
+      analysis_processes (int): The number of processes analyzing the fetched pages (hashing, links extraction and
+        custom audits), the CPU count by default. With 0, pages are analyzed in the crawling thread.
+      custom_audits (bool): Whether to run the custom audits on the crawled pages.
+      writer (BufferedWriter): Saves the crawled pages and their audits as soon as they are analyzed, instead of
+        keeping them in 'pages' and 'audits' until the end of the crawl. Only the URLs of the crawled pages
+        ('crawled_pages') and the links between them are kept.
+      resume_after (datetime): The start of an interrupted run of this crawl: pages of 'known_pages' saved since
+        then are not fetched again, their stored content hash and links are reused.
+      partition (tuple): (shard, shards) to crawl one partition of the URLs of the website (see
+        'get_url_partition()'), seeded with its pages of 'known_pages' and of the sitemaps. With a shared frontier,
+        e.g. a 'PartitionedFrontier', links to pages of other partitions are added to it for their shard to crawl
+        them, they are dropped otherwise. Site structure audits need the whole links graph: they are not run.
+      frontier (Frontier): The queue of URLs to crawl, e.g. a 'RedisFrontier' shared by the crawlers of a website
+        (site structure audits are not run either). A new in-memory 'Frontier' by default.
     """
+    FETCH_STRATEGIES = ("browser", "http", "auto")
+
     def __init__(
             self,
             website: str = None,
             company = None,
+            known_pages: dict = None,
             user_agent: str = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
             exclude_patterns: list[str] = None,
             exclude_pages: list[str] = None,
-            exclude_url_params: bool = True,
+            exclude_url_params: bool = False,
             timeout: int = 15,
-            max_concurrent_requests: int = 5
+            max_concurrent_requests: int = 5,
+            pages_per_browser: int = 100,
+            requests_per_second: float = 2.0,
+            max_concurrent_requests_per_host: int = None,
+            fetch_strategy: str = "browser",
+            use_sitemaps: bool = True,
+            analysis_processes: int = None,
+            custom_audits: bool = True,
+            writer=None,
+            resume_after: datetime = None,
+            partition: tuple[int, int] = None,
+            frontier: Frontier = None
     ):
+        if fetch_strategy not in self.FETCH_STRATEGIES:
+            raise ValueError(f"'fetch_strategy' must be one of {self.FETCH_STRATEGIES}.")
         self.website = website
         self.company = company
+        self.known_pages = known_pages or {}
         self.user_agent = user_agent
         self.exclude_patterns = exclude_patterns or []
         self.exclude_pages = exclude_pages or []
         self.exclude_url_params = exclude_url_params
+        self.canonicalizer = URLCanonicalizer(
+            exclude_url_params=exclude_url_params, exclude_patterns=self.exclude_patterns,
+            exclude_pages=self.exclude_pages
+        )
         self.timeout = timeout
         self.max_concurrent_requests = max_concurrent_requests
+        self.pages_per_browser = pages_per_browser
+        self.fetch_strategy = fetch_strategy
+        self.use_sitemaps = use_sitemaps
+        self.analysis_processes = (os.cpu_count() or 1) if analysis_processes is None else analysis_processes
+        # Fetched pages waiting for their analysis are held in memory: no new page is fetched past this number
+        self.max_pending_analyses = 2 * max(self.analysis_processes, 1)
+        self.custom_audits = custom_audits
+        self.writer = writer
+        self.resume_after = resume_after
+        self.partition = partition
+        self.http_client = None
         self.domain = ""
+        self.robots = None
+        # Politeness: rate limit and concurrency cap per host
+        self.politeness = HostScheduler(
+            requests_per_second=requests_per_second,
+            max_concurrent_per_host=max_concurrent_requests_per_host or max_concurrent_requests,
+        )
         # Temporary storage for JS content
         self.pages_js = {}
+        # URL of the fetched pages after redirects, the base of their relative links (until they are analyzed)
+        self.final_urls = {}
         # Thread pool settings
         self.thread_pool = None
         self.tls = None
+        # Process pool analyzing the fetched pages (None: analyzed in the crawling thread)
+        self.process_pool = None
+        # URLs waiting to be crawled
+        self.frontier = frontier if frontier is not None else Frontier()
         # Crawl stats
         self.current_depth = 0
         self.start_crawl_time = None
         self.end_crawl_time = None
-        self.visited_url = set()
+        self.visited_url = FingerprintSet()
         self.internal_links = []
-        self.pages = set()
+        # Crawled pages not handed to the writer yet (all of them without writer), and the URLs of all of them
+        self.pages = {}
+        self.crawled_pages = set()
+        self.changed_pages = set()
+        self.unchanged_pages = set()
+        self.resumed_pages = set()
         self.audits = []
+        self.browser_launches = 0
+        self.http_fetches = 0
+        self._stats_lock = threading.Lock()
 
     def _init_worker(self, tls):
-        """Initialize the Threads local storage with a Playwright instance."""
-        tls.playwright = sync_playwright().start()
+        """Initialize the Threads local storage with a Playwright instance and its own browser."""
+        tls.playwright = None
         tls.current_page = {}
+        tls.browser = None
+        tls.browser_pages = 0
+        if self.fetch_strategy == "http":
+            return
+        tls.playwright = sync_playwright().start()
+        # In "auto" mode, most pages never need a browser: it is launched on first use
+        if self.fetch_strategy == "browser":
+            self._launch_browser()
 
-    @staticmethod
-    def _remove_trailing_slash(url: str) -> str:
-        """Remove trailing slash from URL (if any)."""
-        if url.endswith('/'):
-            return url[:-1]
-        return url
-
-    def _crawl_at_current_depth(self, pages: set[str]):
-        """Crawl all the pages at the current depth."""
-        pages_at_current_depth = list(pages)
-        internal_urls_found = []
-        limit = self.max_concurrent_requests
-        print(f"Getting content of pages at depth {self.current_depth}...")
-
-        while pages_at_current_depth:
-            print(f"Pages left: {len(pages_at_current_depth)}")
-            current_batch_urls = pages_at_current_depth[:limit]
-            pages_content = []
-            for res in self.thread_pool.map(self._get_page_content, current_batch_urls):
-                pages_content.append(res)
-            for url, html in pages_content:
-                internal_urls_found.extend(self._get_internal_links(html, url))
-            self.visited_url |= set(current_batch_urls)
-            del pages_at_current_depth[:limit]
-
-        new_internal_urls = set(internal_urls_found) - self.visited_url
-        print(f"Depth {self.current_depth} over: {len(new_internal_urls)} new internal links found.")
-        if new_internal_urls:
-            self.current_depth += 1
-            self._crawl_at_current_depth(new_internal_urls)
-        return
+    def _launch_browser(self) -> None:
+        """Launch a new headless Chromium for the current thread, closing the previous one (if any)."""
+        if self.tls.browser is not None:
+            try:
+                self.tls.browser.close()
+            except Exception as e:
+                print(f"Error while closing browser: {e}")
+        self.tls.browser = self.tls.playwright.chromium.launch(headless=True)
+        self.tls.browser_pages = 0
+        with self._stats_lock:
+            self.browser_launches += 1
 
-    def _get_internal_links(self, page_content: str, url: str) -> Generator:
-        """Return all internal links found from a page HTML content."""
-        bs = BeautifulSoup(page_content, 'html.parser')
-        links = bs.findAll('a')
-        for link in links:
-            if not link.get('href'):
-                continue
-            href = link.get('href')
-            if (
-                href.startswith("mailto") or href.startswith("tel") or href.startswith("javascript")
-            ):
+    def _get_browser(self):
+        """Return the browser of the current thread, recycled after 'pages_per_browser' pages or if it crashed."""
+        browser = self.tls.browser
+        if browser is None or not browser.is_connected() or self.tls.browser_pages >= self.pages_per_browser:
+            self._launch_browser()
+        self.tls.browser_pages += 1
+        return self.tls.browser
+
+    def _close_worker(self, barrier: threading.Barrier) -> None:
+        """Close the browser and Playwright instance of the current thread."""
+        try:
+            # Wait for every worker to pick one of these tasks so each thread closes its own browser
+            barrier.wait()
+            if self.tls.browser is not None:
+                self.tls.browser.close()
+            if self.tls.playwright is not None:
+                self.tls.playwright.stop()
+        except Exception as e:
+            print(f"Error while closing worker: {e}")
+
+    @property
+    def is_partial(self) -> bool:
+        """Return True if other crawlers crawl the rest of the website (with 'partition' or a shared frontier)."""
+        return self.partition is not None or self.frontier.shared
+
+    def _build_process_pool(self) -> ProcessPoolExecutor | None:
+        """Return the process pool analyzing the fetched pages, None if they must be analyzed in the crawling thread."""
+        if not self.analysis_processes:
+            return None
+        # Spawned, not forked: the crawling threads (and their browsers) must not be copied in the workers
+        return ProcessPoolExecutor(
+            max_workers=self.analysis_processes, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _get_analysis_args(self, url: str, html: str) -> tuple | None:
+        """Return the arguments of 'analyze_page()' for a fetched page, None if there is nothing to analyze."""
+        js_content, base_url = self.pages_js.pop(url, ""), self.final_urls.pop(url, url)
+        if not html or url in self.unchanged_pages or url not in self.pages:
+            return None
+        return url, html, self.domain, js_content, self.custom_audits, self.canonicalizer, base_url
+
+    def _crawl_frontier(self) -> None:
+        """
+        Crawl pages from the frontier until it is empty, keeping every worker busy.
+
+        Pages go through two stages: they are fetched by the thread pool, then analyzed by the process pool (if any),
+        and the links found are added to the frontier. Both stages run concurrently, fetching is paused while
+        'max_pending_analyses' pages wait for their analysis.
+        """
+        in_flight = {}
+        analyzing = {}
+        while True:
+            while len(in_flight) < self.max_concurrent_requests and len(analyzing) < self.max_pending_analyses:
+                url = self.frontier.pop()
+                if url is None:
+                    break
+                in_flight[self.thread_pool.submit(self._get_page_content, url)] = url
+            if not in_flight and not analyzing:
+                # Nothing left to pop: checked only then, as it is a round trip to Redis for a shared frontier
+                if self.frontier.is_finished():
+                    break
+                # Shared frontier: the last pages crawled by other crawlers may still add new links
+                sleep(1)
                 continue
-            if not href.startswith('http'):
-                leading_slash = '' if href.startswith('/') else '/'
-                href = self.website + leading_slash + href
-            if '#' in href:
-                href = href.split('#')[0]
-            if href.startswith('http://' + self.domain) or href.startswith('https://' + self.domain) and not href.endswith('.pdf'):
-                internal_link = self._remove_trailing_slash(href)
-                yield internal_link
-
-    def _run_custom_audits(self, url: str, page_title: str, page_content: str) -> None:
-        """Run custom audits on the page."""
+
+            done, _ = wait([*in_flight, *analyzing], return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in in_flight:
+                    url = in_flight.pop(future)
+                    try:
+                        _, html = future.result()
+                    except Exception as e:
+                        print(f"Error while crawling {url}: {e}")
+                        html = ""
+                    args = self._get_analysis_args(url, html)
+                    if args is None:
+                        self._process_page(url, None)
+                    elif self.process_pool is None:
+                        self._process_page(url, analyze_page(*args))
+                    else:
+                        analyzing[self.process_pool.submit(analyze_page, *args)] = url
+                else:
+                    url = analyzing.pop(future)
+                    try:
+                        analysis = future.result()
+                    except Exception as e:
+                        print(f"Error while analyzing {url}: {e}")
+                        analysis = None
+                    self._process_page(url, analysis)
+
+    def _process_page(self, url: str, analysis: PageAnalysis | None) -> None:
+        """Mark a page as visited, keep the result of its analysis and add its internal links to the frontier."""
+        self.visited_url.add(url)
+        depth = self.frontier.depth_of(url)
+        if depth > self.current_depth:
+            self.current_depth = depth
+            print(f"Reached depth {depth}: {len(self.visited_url)} pages crawled, {len(self.frontier)} left.")
+        audits = []
+        if url in self.unchanged_pages:
+            # Not modified since the last crawl: its links are the ones found back then
+            internal_links = [
+                InternalLink(from_page=url, to_page=to_page, anchor_text=anchor_text, from_page_depth=depth)
+                for to_page, anchor_text in self.known_pages[url].outlinks
+            ]
+        elif analysis is not None:
+            internal_links = [
+                InternalLink(from_page=url, to_page=to_page, anchor_text=anchor_text, from_page_depth=depth)
+                for to_page, anchor_text in analysis.links
+            ]
+            self.pages[url].content_sha256 = analysis.content_sha256
+            self.pages[url].outlinks = [[to_page, anchor_text] for to_page, anchor_text in analysis.links]
+            audits = self._get_custom_audits(url, analysis.scores)
+        else:
+            internal_links = []
+        page = self.pages.get(url)
+        if page is not None:
+            self.crawled_pages.add(url)
+            if self._is_changed(url, page):
+                self.changed_pages.add(url)
+        for internal_link in internal_links:
+            self.internal_links.append(internal_link)
+            to_page = internal_link.to_page
+            # A shared frontier takes the pages of every partition: the shards of other partitions crawl them
+            in_partition = self.frontier.shared or self._is_in_partition(to_page)
+            if to_page not in self.frontier and self._is_allowed(to_page) and in_partition:
+                self.frontier.add(to_page, depth + 1)
+        if self.writer is not None and page is not None:
+            # A single call: the page is written in the same batch as its audits, before them. It is only marked as
+            # crawled once saved: if the crawler dies before, its lease expires and it is crawled again
+            self.writer.extend([self.pages.pop(url), *audits], on_written=partial(self.frontier.done, url))
+        else:
+            self._save_audits(audits)
+            self.frontier.done(url)
+
+    def _save_audits(self, audits: list) -> None:
+        """Hand new 'DailyPageAudit' objects to the writer, or keep them to be saved at the end of the crawl."""
+        if self.writer is not None:
+            self.writer.extend(audits)
+        else:
+            self.audits.extend(audits)
+
+    def _get_custom_audits(self, url: str, scores: dict[str, float]) -> list:
+        """Return the scores of the custom audits of a page, as 'DailyPageAudit' objects to save."""
         from site_audit.models import DailyPageAudit
-        from commons.utils import call_func_from_str
-        from site_audit.enums import AuditChoices
 
-        for audit in AuditChoices.get_custom_audits():
-            res = call_func_from_str(
-                audit.path, url=url, page_title=page_title, page_content=page_content, depth=self.current_depth
+        today = datetime.now().date()
+        return [
+            DailyPageAudit(page_id=url, company=self.company, audit_id=audit_id, date=today, audit_score=res)
+            for audit_id, res in scores.items()
+        ]
+
+    def _run_link_graph_audits(self) -> None:
+        """Run the site structure audits on all crawled pages, from the internal links graph."""
+        self._save_audits(
+            get_graph_page_audits(
+                self.company, list(self.crawled_pages),
+                [(link.from_page, link.to_page) for link in self.internal_links],
+                self.website
             )
-            audit_obj = DailyPageAudit(
-                page_id=url, company=self.company, audit_id=audit.value, date=datetime.now().date(), audit_score=res
+        )
+
+    def get_page_links(self) -> list:
+        """Return the internal links between crawled pages, as 'PageLink' objects to save in database."""
+        from site_audit.models import PageLink
+
+        return [
+            PageLink(
+                company=self.company,
+                from_page_id=link.from_page,
+                to_page_id=link.to_page,
+                anchor_text=link.anchor_text[:255],
             )
-            self.audits.append(audit_obj)
+            for link in self.internal_links
+            if link.from_page in self.crawled_pages and link.to_page in self.crawled_pages
+        ]
+
+    def _is_changed(self, url: str, page) -> bool:
+        """
+        Return True if a crawled page is new or its content changed since the last crawl.
+
+        Pages answering '304 Not Modified' keep their sha. Pages saved by the interrupted run this crawl resumes may
+        have changed too.
+        """
+        if url in self.resumed_pages or url not in self.known_pages:
+            return True
+        return self.known_pages[url].content_sha256 != page.content_sha256
+
+    def get_changed_pages(self) -> list[str]:
+        """Return the crawled pages whose content changed since the last crawl, and new pages."""
+        return list(self.changed_pages)
 
     def _check_resource(self, route: Route) -> None:
         """Abort requests for non-HTML/JS resources. We don't want to download them."""
@@ -171,60 +407,281 @@ class Crawler:
         else:
             route.continue_()
 
-    def _get_page_content(self, url: str, max_retries: int = 3) -> tuple[str, str]:
-        """Return a tuple containing: (URL of the page, its HTML content)."""
+    def _add_page(self, url: str, headers=None) -> None:
+        """
+        Keep track of a crawled page (and its HTTP validators), to be saved in database.
+
+        Its content hash and links are only known once it has been analyzed (see '_process_page()').
+        """
+        from site_audit.models import Page
+
+        headers = headers or {}
+        content_length = headers.get("content-length")
+        content_length = int(content_length) if content_length and content_length.isdigit() else None
+        self.pages[url] = Page(
+            url=url,
+            last_crawl_at=datetime.now(),
+            company=self.company,
+            etag=self._get_validator(headers, "etag", Page._meta.get_field("etag").max_length),
+            last_modified=self._get_validator(
+                headers, "last-modified", Page._meta.get_field("last_modified").max_length
+            ),
+            # Integer column
+            content_length=content_length if content_length is not None and content_length < 2 ** 31 else None,
+        )
+
+    @staticmethod
+    def _get_validator(headers, name: str, max_length: int) -> str:
+        """Return an HTTP validator header, "" if it is too long to be stored (truncated, it would never match)."""
+        value = headers.get(name, "")
+        return value if len(value) <= max_length else ""
+
+    def _add_unchanged_page(self, url: str) -> None:
+        """Keep track of a page not modified since the last crawl, reusing what was stored back then."""
         from site_audit.models import Page
 
+        known_page = self.known_pages[url]
+        self.unchanged_pages.add(url)
+        self.pages[url] = Page(
+            url=url,
+            content_sha256=known_page.content_sha256,
+            last_crawl_at=datetime.now(),
+            company=self.company,
+            etag=known_page.etag,
+            last_modified=known_page.last_modified,
+            content_length=known_page.content_length,
+            outlinks=known_page.outlinks,
+        )
+
+    def _is_resumed(self, url: str) -> bool:
+        """Return True if a page was already saved by the interrupted run this crawl resumes, and reuse it."""
+        known_page = self.known_pages.get(url)
+        if self.resume_after is None or known_page is None or known_page.last_crawl_at < self.resume_after:
+            return False
+        self.resumed_pages.add(url)
+        self._add_unchanged_page(url)
+        return True
+
+    def _get_conditional_headers(self, url: str) -> dict:
+        """Return the 'If-None-Match'/'If-Modified-Since' headers to send for a page crawled before (if any)."""
+        known_page = self.known_pages.get(url)
+        headers = {}
+        if known_page is not None:
+            if known_page.etag:
+                headers["If-None-Match"] = known_page.etag
+            if known_page.last_modified:
+                headers["If-Modified-Since"] = known_page.last_modified
+        return headers
+
+    def _handle_http_response(self, url: str, response: httpx.Response) -> str | None:
+        """Keep track of a page downloaded without a browser and return its HTML, None if a browser must render it."""
+        if response.status_code == 304 and url in self.known_pages:
+            self._add_unchanged_page(url)
+            return ""
+        if response.is_error or "html" not in response.headers.get("content-type", ""):
+            return ""
+        content = response.text
+        if self.fetch_strategy == "auto" and looks_js_rendered(content):
+            print(f"Page looks JS-rendered, rendering it with a browser: {url}")
+            return None
+        self._add_page(url, response.headers)
+        self.final_urls[url] = str(response.url)
+        return content
+
+    def _is_unchanged(self, url: str) -> bool:
+        """Send a conditional request for a page crawled before, return True if it has not been modified since."""
+        headers = self._get_conditional_headers(url)
+        if not headers:
+            return False
+        try:
+            with self.politeness.slot(url):
+                # Streamed: the body is never downloaded, only the status code matters
+                with self.http_client.stream("GET", url, headers=headers) as response:
+                    not_modified = response.status_code == 304
+        except Exception as e:
+            print(f"Error: {e}")
+            return False
+        if not_modified:
+            self._add_unchanged_page(url)
+        return not_modified
+
+    def _get_page_content(self, url: str) -> tuple[str, str]:
+        """Return a tuple containing: (URL of the page, its HTML content), fetched according to 'fetch_strategy'."""
+        if self._is_resumed(url):
+            return url, ""
+        if self.fetch_strategy == "browser":
+            if self._is_unchanged(url):
+                return url, ""
+            return self._render_page(url)
+
+        response = self._fetch_page(url)
+        if response is None:
+            return url, ""
+        content = self._handle_http_response(url, response)
+        if content is None:
+            return self._render_page(url)
+        return url, content
+
+    def _fetch_page(self, url: str, max_retries: int = 3) -> httpx.Response | None:
+        """Return the response of a page downloaded without a browser (conditionally if crawled before)."""
         if max_retries > 0:
-            browser = self.tls.playwright.chromium.launch(headless=True)
-            context = browser.new_context(accept_downloads=False, user_agent=self.user_agent)
-            page = context.new_page()
+            try:
+                with self.politeness.slot(url):
+                    response = self.http_client.get(url, headers=self._get_conditional_headers(url))
+                with self._stats_lock:
+                    self.http_fetches += 1
+                return response
+            except Exception as e:
+                print(f"Error: {e}")
+            print("Waiting 1 second before retrying...")
+            sleep(1)
+            print(f"Retrying: {url} >> {max_retries} more time(s)...")
+            return self._fetch_page(url, max_retries - 1)
+        return None
+
+    def _render_page(self, url: str, max_retries: int = 3) -> tuple[str, str]:
+        """Return a tuple containing: (URL of the page, its HTML content), rendered with a browser."""
+        if max_retries > 0:
+            context = None
             self.tls.current_page[threading.current_thread().name] = {"url": url, "js": ""}
             try:
+                context = self._get_browser().new_context(accept_downloads=False, user_agent=self.user_agent)
+                page = context.new_page()
                 page.route("**/*.*", self._check_resource)
-                sleep(randint(0, 6))
-                page.goto(url, timeout=self.timeout * 1000)
+                with self.politeness.slot(url):
+                    response = page.goto(url, timeout=self.timeout * 1000)
                 content = str(page.content())
-                title = str(page.title())
-                sha = hashlib.sha256(self.tls.current_page[threading.current_thread().name]["js"].encode('utf-8') + content.encode('utf-8')).hexdigest()
                 print(f"done get page from thread: {threading.current_thread().name}")
-                #self._run_custom_audits(url, title, content)
-                page.close()
-                context.close()
-                browser.close()
-                self.pages.add(
-                    Page(
-                        url=url, content_sha256=sha, last_crawl_at=datetime.now(), company=self.company
-                    )
-                )
+                # Part of the page hash, computed with its analysis
+                self.pages_js[url] = self.tls.current_page[threading.current_thread().name]["js"]
+                self.final_urls[url] = page.url
+                self._add_page(url, response.headers if response else None)
                 return url, content
             except Exception as e:
                 print(f"Error: {e}")
-                page.close()
-                context.close()
-                browser.close()
-                if max_retries > 0:
-                    print("Waiting 1 second before retrying...")
-                    sleep(1)
-                    print(f"Retrying: {url} >> {max_retries} more time(s)...")
-                    return self._get_page_content(url, max_retries - 1)
-                return url, ""
+                if context is None:
+                    # The browser is unusable (e.g. it crashed): relaunched for the next try
+                    self.tls.browser_pages = self.pages_per_browser
+            finally:
+                # Closing the context also closes its page, the browser is kept for the next pages
+                if context is not None:
+                    try:
+                        context.close()
+                    except Exception as e:
+                        print(f"Error while closing context: {e}")
+            print("Waiting 1 second before retrying...")
+            sleep(1)
+            print(f"Retrying: {url} >> {max_retries} more time(s)...")
+            return self._render_page(url, max_retries - 1)
         return url, ""
 
+    def _load_robots_txt(self) -> None:
+        """Fetch the robots.txt of the website."""
+        try:
+            response = self.http_client.get(f"{self.website}/robots.txt")
+            # No robots.txt (4xx): everything is allowed
+            self._parse_robots_txt(response.text if response.is_success else "")
+        except Exception as e:
+            print(f"Unable to read robots.txt: {e}")
+            self._parse_robots_txt("")
+
+    def _parse_robots_txt(self, content: str) -> None:
+        """Parse the robots.txt of the website and honor its 'Crawl-delay' (if any)."""
+        from urllib.robotparser import RobotFileParser
+
+        self.robots = RobotFileParser(f"{self.website}/robots.txt")
+        self.robots.parse(content.splitlines())
+        delay = self.robots.crawl_delay(self.user_agent)
+        if delay:
+            print(f"Honoring 'Crawl-delay: {delay}' from robots.txt.")
+            self.politeness.set_crawl_delay(self.domain, float(delay))
+
+    def _is_allowed(self, url: str) -> bool:
+        """Return True if the URL is not excluded from the crawl and robots.txt allows crawling it."""
+        if self.canonicalizer.is_excluded(url):
+            return False
+        return self.robots is None or self.robots.can_fetch(self.user_agent, url)
+
+    def _is_in_partition(self, url: str) -> bool:
+        """Return True if the URL is crawled by this crawler: all are without 'partition'."""
+        if self.partition is None:
+            return True
+        shard, shards = self.partition
+        return get_url_partition(url, shards) == shard
+
+    def _add_start_pages(self) -> None:
+        """Add the home page to the frontier and, when crawling a partition, its pages known from the last crawl."""
+        if self._is_in_partition(self.website):
+            self.frontier.add(self.website, 0)
+        if self.partition is not None:
+            # Queued right after the home page: their actual depth ('CRAWL_DEPTH') comes from the links graph
+            seeded = sum(
+                self.frontier.add(url, 1)
+                for url in self.known_pages if self._is_in_partition(url) and self._is_allowed(url)
+            )
+            print(f"{seeded} known pages in partition {self.partition[0] + 1}/{self.partition[1]}.")
+
+    def _build_http_client(self, client_class=httpx.Client):
+        """Return a pooled HTTP client (sync or async) configured for the crawl."""
+        return client_class(
+            headers={"User-Agent": self.user_agent},
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_concurrent_requests),
+        )
+
+    def _seed_from_sitemaps(self, client: httpx.Client) -> None:
+        """
+        Add all pages listed in the sitemaps of the website to the frontier, before the crawl starts.
+
+        Sitemaps are the ones referenced in robots.txt (or '/sitemap.xml'), nested sitemap indexes included. Their
+        pages are queued right after the home page: their actual depth ('CRAWL_DEPTH') comes from the links graph.
+        """
+        sitemaps = (self.robots.site_maps() if self.robots else None) or [f"{self.website}/sitemap.xml"]
+        seeded = 0
+        for url in fetch_sitemaps_urls(client, sitemaps, self.max_concurrent_requests):
+            url = self.canonicalizer.canonicalize(url)
+            if urlparse(url).hostname != self.domain or not self._is_allowed(url) or not self._is_in_partition(url):
+                continue
+            if self.frontier.add(url, 1):
+                seeded += 1
+        print(f"{seeded} pages found in sitemaps.")
+
     def crawl(self):
         """Start crawling all the pages of the website."""
         try:
             self.validate_website()
+            self.http_client = self._build_http_client()
+            self._load_robots_txt()
             self.tls = threading.local()
             self.thread_pool = ThreadPoolExecutor(
                 max_workers=self.max_concurrent_requests, initializer=self._init_worker, initargs=(self.tls,)
             )
+            self.process_pool = self._build_process_pool()
             self.start_crawl_time = datetime.now()
-            self._crawl_at_current_depth({self.website})
+            self._add_start_pages()
+            if self.use_sitemaps:
+                self._seed_from_sitemaps(self.http_client)
+            self._crawl_frontier()
+            if not self.is_partial:
+                self._run_link_graph_audits()
             self.end_crawl_time = datetime.now()
-            print(f"Crawling '{self.website}' ({len(self.visited_url)} pages) done in {self.end_crawl_time - self.start_crawl_time}.")
+            print(
+                f"Crawling '{self.website}' ({len(self.visited_url)} pages) done in "
+                f"{self.end_crawl_time - self.start_crawl_time} with {self.http_fetches} HTTP fetch(es) and "
+                f"{self.browser_launches} browser launch(es)."
+            )
+            print(f"Politeness stats: {self.politeness.stats()}")
         finally:
-            self.thread_pool.shutdown(wait=False)
+            if self.thread_pool is not None:
+                barrier = threading.Barrier(self.max_concurrent_requests, timeout=60)
+                for _ in range(self.max_concurrent_requests):
+                    self.thread_pool.submit(self._close_worker, barrier)
+                self.thread_pool.shutdown(wait=False)
+            if self.process_pool is not None:
+                self.process_pool.shutdown(cancel_futures=True)
+            if self.http_client is not None:
+                self.http_client.close()
 
     def validate_website(self) -> None:
         """Make sure 'self.website' is a valid URL and is the root page of website."""
@@ -236,112 +693,568 @@ class Crawler:
         URLValidator()(self.website)  # raises ValidationError if not valid URL
         parsed_url = urlparse(self.website)
         # Keep only scheme and hostname (root)
-        self.website = f"{parsed_url.scheme}://{parsed_url.hostname}"
-        self.domain = parsed_url.hostname
-        self.visited_url.add(self.website)
+        self.website = self.canonicalizer.canonicalize(f"{parsed_url.scheme}://{parsed_url.netloc}")
+        self.domain = urlparse(self.website).hostname
+
+
+class AsyncCrawler(Crawler):
+    """
+    A Crawler running all its pages in a single asyncio event loop, instead of a pool of threads.
+
+    A single browser is shared by all the pages (one context per page), and failed pages are retried with an
+    exponential backoff. As pages are not bound to threads, 'max_concurrent_requests' can be much higher than
+    with the threaded Crawler.
+
+    Kwargs for initialization (on top of the Crawler ones):
+    -------------------------
+      max_open_pages (int): The maximum number of pages rendered at the same time in the browser.
+      max_retries (int): The number of times a page is retried before being given up.
+    """
+    def __init__(self, *args, max_open_pages: int = 10, max_retries: int = 3, **kwargs):
+        kwargs.setdefault("max_concurrent_requests", 50)
+        super().__init__(*args, **kwargs)
+        self.max_open_pages = max_open_pages
+        self.max_retries = max_retries
+        self.playwright = None
+        self.browser = None
+        self.browser_semaphore = None
+        self._browser_lock = None
+        # Wrapping bound methods: on give up, 'retry' returns (first argument, "") which is (url, "")
+        self._render_page_with_retry = retry(self._retry_policy)(self._render_page_async)
+        self._fetch_page_with_retry = retry(self._retry_policy)(self._fetch_page_async)
+
+    def _retry_policy(self, info: RetryInfo) -> tuple[bool, float]:
+        """Give up after 'max_retries' retries, waiting 1, 2, 4... seconds (10 at most) between retries."""
+        print(f"Error: {info.exception}")
+        return info.fails > self.max_retries, min(2 ** (info.fails - 1), 10)
+
+    async def _get_browser_async(self):
+        """Return the browser shared by all pages, relaunched if it crashed."""
+        async with self._browser_lock:
+            if self.browser is None or not self.browser.is_connected():
+                self.browser = await self.playwright.chromium.launch(headless=True)
+                self.browser_launches += 1
+            return self.browser
+
+    async def _is_unchanged_async(self, url: str) -> bool:
+        """Send a conditional request for a page crawled before, return True if it has not been modified since."""
+        headers = self._get_conditional_headers(url)
+        if not headers:
+            return False
+        try:
+            async with self.politeness.async_slot(url):
+                # Streamed: the body is never downloaded, only the status code matters
+                async with self.http_client.stream("GET", url, headers=headers) as response:
+                    not_modified = response.status_code == 304
+        except Exception as e:
+            print(f"Error: {e}")
+            return False
+        if not_modified:
+            self._add_unchanged_page(url)
+        return not_modified
+
+    async def _get_page_content_async(self, url: str) -> tuple[str, str]:
+        """Return a tuple containing: (URL of the page, its HTML content), fetched according to 'fetch_strategy'."""
+        if self._is_resumed(url):
+            return url, ""
+        if self.fetch_strategy == "browser":
+            if await self._is_unchanged_async(url):
+                return url, ""
+            return await self._render_page_with_retry(url)
+
+        _, response = await self._fetch_page_with_retry(url)
+        if not isinstance(response, httpx.Response):
+            # Given up after 'max_retries' retries
+            return url, ""
+        content = self._handle_http_response(url, response)
+        if content is None:
+            return await self._render_page_with_retry(url)
+        return url, content
+
+    async def _fetch_page_async(self, url: str) -> tuple[str, httpx.Response]:
+        """Return a tuple containing: (URL of the page, its response), downloaded without a browser."""
+        async with self.politeness.async_slot(url):
+            response = await self.http_client.get(url, headers=self._get_conditional_headers(url))
+        self.http_fetches += 1
+        return url, response
+
+    async def _render_page_async(self, url: str) -> tuple[str, str]:
+        """Return a tuple containing: (URL of the page, its HTML content), rendered with the shared browser."""
+        js = []
+
+        async def check_resource(route) -> None:
+            """Abort requests for non-HTML/JS resources, and keep the JS content to compute the page hash."""
+            if route.request.resource_type in ["image", "media", "font", "stylesheet"]:
+                await route.abort()
+            elif route.request.resource_type == "script":
+                exclude_list = ["analytics.js", "gtm.js", "matomo.js"]
+                if any(script for script in exclude_list if script in route.request.url):
+                    await route.abort()
+                else:
+                    res = await route.fetch()
+                    js.append(await res.text())
+                    await route.fulfill(response=res)
+            else:
+                await route.continue_()
+
+        async with self.browser_semaphore:
+            browser = await self._get_browser_async()
+            context = await browser.new_context(accept_downloads=False, user_agent=self.user_agent)
+            try:
+                page = await context.new_page()
+                await page.route("**/*.*", check_resource)
+                async with self.politeness.async_slot(url):
+                    response = await page.goto(url, timeout=self.timeout * 1000)
+                content = str(await page.content())
+                final_url = page.url
+            finally:
+                await context.close()
+        self.pages_js[url] = "".join(js)
+        self.final_urls[url] = final_url
+        self._add_page(url, response.headers if response else None)
+        return url, content
+
+    async def _load_robots_txt_async(self) -> None:
+        """Fetch the robots.txt of the website."""
+        try:
+            response = await self.http_client.get(f"{self.website}/robots.txt")
+            # No robots.txt (4xx): everything is allowed
+            self._parse_robots_txt(response.text if response.is_success else "")
+        except Exception as e:
+            print(f"Unable to read robots.txt: {e}")
+            self._parse_robots_txt("")
+
+    async def _crawl_frontier_async(self) -> None:
+        """Crawl pages from the frontier until it is empty, keeping up to 'max_concurrent_requests' pages in flight."""
+        loop = asyncio.get_running_loop()
+        in_flight = {}
+        analyzing = {}
+        while True:
+            while len(in_flight) < self.max_concurrent_requests and len(analyzing) < self.max_pending_analyses:
+                url = self.frontier.pop()
+                if url is None:
+                    break
+                in_flight[asyncio.create_task(self._get_page_content_async(url))] = url
+            if not in_flight and not analyzing:
+                # Nothing left to pop: checked only then, as it is a round trip to Redis for a shared frontier
+                if self.frontier.is_finished():
+                    break
+                # Shared frontier: the last pages crawled by other crawlers may still add new links
+                await asyncio.sleep(1)
+                continue
+
+            done, _ = await asyncio.wait([*in_flight, *analyzing], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task in in_flight:
+                    url = in_flight.pop(task)
+                    try:
+                        _, html = task.result()
+                    except Exception as e:
+                        print(f"Error while crawling {url}: {e}")
+                        html = ""
+                    args = self._get_analysis_args(url, html)
+                    if args is None:
+                        self._process_page(url, None)
+                    else:
+                        # Without a process pool, analyzed in the default thread pool: the event loop is not blocked
+                        analyzing[loop.run_in_executor(self.process_pool, analyze_page, *args)] = url
+                else:
+                    url = analyzing.pop(task)
+                    try:
+                        analysis = task.result()
+                    except Exception as e:
+                        print(f"Error while analyzing {url}: {e}")
+                        analysis = None
+                    self._process_page(url, analysis)
+
+    def _seed_from_sitemaps_with_new_client(self) -> None:
+        """Seed the frontier from sitemaps with a sync HTTP client (sitemaps are parsed in a thread pool)."""
+        with self._build_http_client() as client:
+            self._seed_from_sitemaps(client)
+
+    async def _crawl_async(self) -> None:
+        """Start crawling all the pages of the website, in the current event loop."""
+        self.validate_website()
+        self.browser_semaphore = asyncio.Semaphore(self.max_open_pages)
+        self._browser_lock = asyncio.Lock()
+        self.http_client = self._build_http_client(httpx.AsyncClient)
+        self.process_pool = self._build_process_pool()
+        try:
+            await self._load_robots_txt_async()
+            if self.fetch_strategy != "http":
+                self.playwright = await async_playwright().start()
+            self.start_crawl_time = datetime.now()
+            self._add_start_pages()
+            if self.use_sitemaps:
+                await asyncio.to_thread(self._seed_from_sitemaps_with_new_client)
+            await self._crawl_frontier_async()
+            if not self.is_partial:
+                self._run_link_graph_audits()
+            self.end_crawl_time = datetime.now()
+            print(
+                f"Crawling '{self.website}' ({len(self.visited_url)} pages) done in "
+                f"{self.end_crawl_time - self.start_crawl_time} with {self.http_fetches} HTTP fetch(es) and "
+                f"{self.browser_launches} browser launch(es)."
+            )
+            print(f"Politeness stats: {self.politeness.stats()}")
+        finally:
+            if self.process_pool is not None:
+                self.process_pool.shutdown(cancel_futures=True)
+            await self.http_client.aclose()
+            if self.browser is not None:
+                await self.browser.close()
+            if self.playwright is not None:
+                await self.playwright.stop()
+
+    def crawl(self):
+        """Start crawling all the pages of the website."""
+        asyncio.run(self._crawl_async())
+
+
+def get_graph_page_audits(company, urls: list[str], links: list[tuple[str, str]], root: str) -> list:
+    """Return the site structure audits of pages, as 'DailyPageAudit' objects, from the internal links graph."""
+    from site_audit.enums import AuditChoices
+    from site_audit.models import DailyPageAudit
+
+    metrics = compute_link_metrics(urls, links, root=root)
+    today = datetime.now().date()
+    return [
+        DailyPageAudit(
+            page_id=url, company=company, audit_id=audit.value, date=today,
+            audit_score=None if score != score else score  # NaN: unreachable page
+        )
+        for audit in AuditChoices.get_graph_audits()
+        for url, score in zip(urls, metrics[audit.path].tolist())
+    ]
+
+
+# Lighthouse processes at the same time: at most 2 * MAX_LIGHTHOUSE_CONTAINERS * 'max_workers'
+@site_audit.function(
+    image=django_app_image, timeout=3600*3, concurrency_limit=MAX_LIGHTHOUSE_CONTAINERS, cpu=LIGHTHOUSE_CPUS
+)
+def run_psi_audit_batch(
+        urls: list[str] = None, max_workers: int = None, timeout: int = 180, audits_per_browser: int = 20
+) -> list:
+    """Run the Google Page Speed Insights audits via Lighthouse on a batch of urls and return their scores."""
+    django.setup()
+    from site_audit.lighthouse import iter_psi_scores
+
+    return list(iter_psi_scores(urls, max_workers or LIGHTHOUSE_CPUS, timeout, audits_per_browser))
 
 
 @site_audit.function(
     image=django_app_image,
     secrets=[modal.Secret.from_name("database")],
-    timeout=3600*3
+    timeout=3600*3,
+    concurrency_limit=MAX_LIGHTHOUSE_CONTAINERS,
+    cpu=LIGHTHOUSE_CPUS
 )
-def run_psi_audit(urls: list[str] = None, company_id: int = None):
-    """Run the Google Page Speed Insights audits via Lighthouse on a list of urls."""
+def run_psi_audit(
+        urls: list[str] = None, company_id: int = None, max_workers: int = None, timeout: int = 180,
+        containers: int = 1, audits_per_browser: int = 20, resume: bool = True
+):
+    """
+    Run the Google Page Speed Insights audits via Lighthouse on a list of urls.
+
+    Up to 'max_workers' Lighthouse processes per container (its reserved CPUs by default) run at the same time, each
+    one killed after 'timeout' seconds. Each worker keeps its own Chrome open, restarted every 'audits_per_browser'
+    audits.
+    With 'containers' > 1, urls are split in as many batches audited in separate containers.
+    Scores are saved as audits complete: with 'resume', urls already audited today (e.g. by an interrupted run)
+    are skipped.
+    """
     django.setup()
-    import subprocess
-    import json
-    from commons.utils import OpenAndCloseDbConnection
-    from commons.utils import get_nested_value
+    from commons.utils import BufferedWriter, OpenAndCloseDbConnection
+    from django.db.models import F
     from site_audit.enums import AuditChoices, CrawlStatus
-    from site_audit.models import DailyPageAudit, DailyPsiAudit
+    from site_audit.lighthouse import iter_psi_scores
+    from site_audit.models import (
+        DailyPageAudit, DailyPsiAudit, DailySiteMetric, LatestPageAudit, save_daily_page_audits
+    )
 
+    urls = list(urls)
+    today = datetime.now().date()
     with OpenAndCloseDbConnection():
-        DailyPsiAudit.objects.create(company_id=company_id, pages_audited=len(urls))
+        if resume:
+            audited_urls = set(
+                LatestPageAudit.objects.filter(
+                    company_id=company_id, date=today, audit_id=AuditChoices.PSI_PERFORMANCE_SCORE, page_id__in=urls
+                ).values_list("page_id", flat=True)
+            )
+            urls = [url for url in urls if url not in audited_urls]
+        daily_psi_stats = DailyPsiAudit.objects.create(company_id=company_id, pages_audited=len(urls))
 
-    audits = []
-    for url in urls:
-        ps = subprocess.Popen([
-            "lighthouse",
-            str(url),
-            "--quiet",
-            "--output=json",
-            "--disable-full-page-screenshot",
-            '--chrome-flags="--no-sandbox --headless"'
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    def record_progress(batch: dict) -> None:
+        # All the scores of a page are written in the same batch
+        pages_done = len({page_audit.page_id for page_audit in batch[DailyPageAudit]})
+        DailyPsiAudit.objects.filter(id=daily_psi_stats.id).update(pages_done=F("pages_done") + pages_done)
+
+    if containers > 1:
+        chunks = [urls[i::containers] for i in range(containers)]
+        batches = run_psi_audit_batch.map(
+            chunks,
+            kwargs={"max_workers": max_workers, "timeout": timeout, "audits_per_browser": audits_per_browser},
+            order_outputs=False
         )
-        stdout, stderr = ps.communicate()
-        if stderr:
-            print(stderr)
-        else:
-            # Create new 'DailyPageAudit' objects
-            results = json.loads(stdout)
-            for audit in AuditChoices.get_psi_audits():
-                audit_result = get_nested_value(results, audit.path)
-                audits.append(
-                    DailyPageAudit(
-                        audit_id=audit.value,
-                        audit_score=audit_result,
-                        page_id=url,
-                        date=datetime.now().date(),
-                        company_id=company_id
-                    )
-                )
+        results = (result for batch in batches for result in batch)
+    else:
+        results = iter_psi_scores(urls, max_workers or LIGHTHOUSE_CPUS, timeout, audits_per_browser)
+
     with OpenAndCloseDbConnection():
-        daily_psi_stats = DailyPsiAudit.objects.get()
         try:
-            DailyPageAudit.objects.bulk_create(audits, 1024)
+            # Save new 'DailyPageAudit' objects as audits complete
+            with BufferedWriter({DailyPageAudit: save_daily_page_audits}, on_flush=record_progress) as writer:
+                for url, scores in results:
+                    writer.extend(
+                        DailyPageAudit(
+                            audit_id=audit_id,
+                            audit_score=audit_score,
+                            page_id=url,
+                            date=today,
+                            company_id=company_id
+                        )
+                        for audit_id, audit_score in scores.items()
+                    )
+            # Only the site averages of the PSI audits are affected
+            DailySiteMetric.aggregate(company_id, today, {audit.value for audit in AuditChoices.get_psi_audits()})
             daily_psi_stats.status = CrawlStatus.SUCCESS
         except:
             daily_psi_stats.status = CrawlStatus.FAILED
         finally:
             daily_psi_stats.finished_at = datetime.now()
-            daily_psi_stats.save()
+            # 'pages_done' is only updated by the writer
+            daily_psi_stats.save(update_fields=["status", "finished_at"])
+
+
+def _crawl(
+        company, crawl_id: int, resume_after: datetime, async_engine: bool, partition: tuple = None,
+        frontier: Frontier = None
+) -> Crawler:
+    """
+    Crawl a website (or a part of it), saving pages and their audits as they are crawled, then its links.
+
+    Crawling a part of a website (with 'partition' or a shared 'frontier'), links are left to '_finish_crawl()'.
+
+    Each saved batch updates 'pages_crawled' of the crawl log: called again after an interruption, with the start of
+    the crawl as 'resume_after', pages already saved are not fetched again.
+    """
+    from commons.utils import BufferedWriter, OpenAndCloseDbConnection, bulk_upsert
+    from django.db import transaction
+    from django.db.models import F
+    from site_audit.models import DailyCrawl, DailyPageAudit, Page, PageLink, save_daily_page_audits
+
+    with OpenAndCloseDbConnection():
+        existing_pages = Page.objects.filter(company_id=company.id).only(
+            "url", "last_crawl_at", "content_sha256", "etag", "last_modified", "content_length", "outlinks"
+        ).in_bulk(field_name="url")
+
+    def record_progress(batch: dict) -> None:
+        DailyCrawl.objects.filter(id=crawl_id).update(pages_crawled=F("pages_crawled") + len(batch[Page]))
+
+    # Pages are written before their audits, in the same transaction
+    writer = BufferedWriter(
+        {
+            Page: partial(
+                bulk_upsert,
+                Page,
+                unique_fields=["company", "url"],
+                update_fields=[
+                    "last_crawl_at", "content_sha256", "etag", "last_modified", "content_length", "outlinks"
+                ],
+            ),
+            DailyPageAudit: save_daily_page_audits,
+        },
+        on_flush=record_progress,
+    )
+    crawler_class = AsyncCrawler if async_engine else Crawler
+    crawler = crawler_class(
+        website=company.website, company=company, known_pages=existing_pages, fetch_strategy="auto",
+        exclude_patterns=company.crawl_exclude_patterns, exclude_pages=company.crawl_exclude_pages, writer=writer,
+        resume_after=resume_after, partition=partition, frontier=frontier
+    )
+    # Custom and site structure audits are saved as they are run
+    with writer:
+        crawler.crawl()
+
+    if not crawler.is_partial:
+        with OpenAndCloseDbConnection():
+            # Replace the links graph of the previous crawl
+            with transaction.atomic():
+                PageLink.objects.filter(company_id=company.id).delete()
+                bulk_upsert(PageLink, crawler.get_page_links())
+    return crawler
+
+
+def _canonicalize_pages(company) -> None:
+    """
+    Rename the saved pages of a website whose URL is not canonical (see 'URLCanonicalizer'), with their audits.
+
+    Otherwise, pages saved before URLs were canonicalized would be crawled again as new pages. A page whose canonical
+    URL is already saved is a duplicate: it is deleted.
+    """
+    from django.db import transaction
+    from site_audit.models import DailyPageAudit, DailyPageScores, LatestPageAudit, Page, PageLink
+
+    canonicalizer = URLCanonicalizer()
+    urls = set(Page.objects.filter(company_id=company.id).values_list("url", flat=True))
+    renamed_urls = {}
+    duplicates = []
+    for url in urls:
+        canonical_url = canonicalizer.canonicalize(url)
+        if canonical_url == url:
+            continue
+        if canonical_url in urls or canonical_url in renamed_urls.values():
+            duplicates.append(url)
+        else:
+            renamed_urls[url] = canonical_url
+    if not renamed_urls and not duplicates:
+        return
 
+    # Foreign keys are only checked at commit: the rows referencing a page are renamed after it
+    with transaction.atomic():
+        Page.objects.filter(url__in=duplicates).delete()
+        for url, canonical_url in renamed_urls.items():
+            Page.objects.filter(url=url).update(url=canonical_url)
+            for model in (DailyPageAudit, LatestPageAudit, DailyPageScores):
+                model.objects.filter(page_id=url).update(page_id=canonical_url)
+            PageLink.objects.filter(from_page_id=url).update(from_page_id=canonical_url)
+            PageLink.objects.filter(to_page_id=url).update(to_page_id=canonical_url)
+    print(f"{len(renamed_urls)} pages renamed to their canonical URL, {len(duplicates)} duplicated pages deleted.")
 
-@site_audit.function(image=django_app_image, timeout=3600*3, secrets=[modal.Secret.from_name("database")])
-def crawl_website(company_id: int = None, crawl_id: int = None):
-    """Start the crawl async task for a specific website."""
+
+def _finish_crawl(company, crawl_started_at: datetime, changed_pages: set[str], graph_audits: bool = False) -> None:
+    """
+    Update the site averages of a crawled website and run the PSI audits of its changed pages.
+
+    With 'graph_audits', the links graph is first rebuilt from the links of the pages saved by all the shards of the
+    crawl, and the site structure audits are run.
+    """
+    from commons.utils import OpenAndCloseDbConnection, bulk_upsert
+    from django.db import transaction
+    from site_audit.enums import AuditChoices
+    from site_audit.models import DailySiteMetric, LatestPageAudit, Page, PageLink, save_daily_page_audits
+
+    with OpenAndCloseDbConnection():
+        if graph_audits:
+            outlinks = dict(
+                Page.objects.filter(company_id=company.id, last_crawl_at__gte=crawl_started_at)
+                .values_list("url", "outlinks")
+            )
+            page_links = [
+                PageLink(company=company, from_page_id=url, to_page_id=to_page, anchor_text=anchor_text[:255])
+                for url, page_outlinks in outlinks.items()
+                for to_page, anchor_text in page_outlinks or []
+                if to_page in outlinks
+            ]
+            with transaction.atomic():
+                PageLink.objects.filter(company_id=company.id).delete()
+                bulk_upsert(PageLink, page_links)
+            # Same root page as the crawlers (see 'Crawler.validate_website()')
+            website = urlparse(company.website)
+            save_daily_page_audits(
+                get_graph_page_audits(
+                    company, list(outlinks), [(link.from_page_id, link.to_page_id) for link in page_links],
+                    URLCanonicalizer().canonicalize(f"{website.scheme}://{website.netloc}")
+                )
+            )
+
+        # Unchanged pages keep their latest scores, pages not found anymore don't count in the averages
+        LatestPageAudit.objects.filter(company_id=company.id, page__last_crawl_at__lt=crawl_started_at).delete()
+        DailySiteMetric.aggregate(
+            company.id,
+            audits={audit.value for audit in (*AuditChoices.get_custom_audits(), *AuditChoices.get_graph_audits())}
+        )
+
+    # Run PSI audits on updated pages or new pages
+    run_psi_audit.spawn(
+        urls=changed_pages, company_id=company.id, containers=get_psi_containers_count(len(changed_pages))
+    )
+
+
+# Shards have their own containers: the crawls of sharded websites wait for their shards without blocking them
+@site_audit.function(
+    image=django_app_image,
+    timeout=3600*3,
+    secrets=[modal.Secret.from_name("database")],
+    concurrency_limit=MAX_CONCURRENT_CRAWLS
+)
+def crawl_website_shard(
+        company_id: int = None, crawl_id: int = None, shard: int = 0, shards: int = 1, async_engine: bool = False
+) -> tuple[list[str], int]:
+    """
+    Crawl one shard of a website, return its changed pages and the number of pages crawled.
+
+    With 'settings.SITE_AUDIT_SHARED_FRONTIER', all the shards pop URLs from the same frontier in Redis. Else, each
+    shard crawls one partition of the URLs of the website first: the URLs found by a shard are queued for the shard
+    of their partition (see 'PartitionedFrontier'). Either way, a shard dying is made up for by the others.
+    """
     django.setup()
     from commons.utils import OpenAndCloseDbConnection
+    from django.conf import settings
+    from site_audit.models import DailyCrawl
+    from users.models import Company
+
+    with OpenAndCloseDbConnection():
+        company = Company.objects.get(id=company_id)
+        crawl_started_at = DailyCrawl.objects.values_list("started_at", flat=True).get(id=crawl_id)
+    if settings.SITE_AUDIT_SHARED_FRONTIER:
+        crawler = _crawl(company, crawl_id, crawl_started_at, async_engine, frontier=RedisFrontier(f"crawl:{crawl_id}"))
+    else:
+        crawler = _crawl(
+            company, crawl_id, crawl_started_at, async_engine, partition=(shard, shards),
+            frontier=PartitionedFrontier(f"crawl:{crawl_id}", shard, shards)
+        )
+    return crawler.get_changed_pages(), len(crawler.visited_url)
+
+
+@site_audit.function(
+    image=django_app_image,
+    timeout=3600*3,
+    secrets=[modal.Secret.from_name("database")],
+    concurrency_limit=MAX_CONCURRENT_CRAWLS
+)
+def crawl_website(company_id: int = None, crawl_id: int = None, async_engine: bool = False, shards: int = 1):
+    """
+    Start the crawl async task for a specific website ('async_engine' to crawl it in a single event loop).
+
+    With 'shards' > 1, the website is crawled by as many containers (see 'crawl_website_shard()').
+    Pages and their audits are saved as they are crawled, and 'pages_crawled' of the crawl log updated: called again
+    with the 'crawl_id' of an interrupted crawl, pages it already saved are not fetched again.
+    """
+    django.setup()
+    from commons.utils import OpenAndCloseDbConnection
+    from django.conf import settings
     from site_audit.enums import CrawlStatus
-    from site_audit.models import DailyCrawl, Page
+    from site_audit.models import DailyCrawl
     from users.models import Company
 
+    pages_crawled = 0
     try:
         company = None
         with OpenAndCloseDbConnection():
             company = Company.objects.get(id=company_id)
-        crawler = Crawler(website=company.website, company=company)
-        crawler.crawl()
+            crawl_started_at = DailyCrawl.objects.values_list("started_at", flat=True).get(id=crawl_id)
+            _canonicalize_pages(company)
+        if shards > 1:
+            changed_pages = set()
+            for shard_changed_pages, shard_pages_crawled in crawl_website_shard.map(
+                    range(shards), kwargs={
+                        "company_id": company_id, "crawl_id": crawl_id, "shards": shards, "async_engine": async_engine
+                    }
+            ):
+                changed_pages.update(shard_changed_pages)
+                pages_crawled += shard_pages_crawled
+        else:
+            crawler = _crawl(company, crawl_id, crawl_started_at, async_engine)
+            changed_pages = set(crawler.get_changed_pages())
+            pages_crawled = len(crawler.visited_url)
         status = CrawlStatus.SUCCESS
-
-        # Retrieve pages with updated content since last crawl
-        updated_pages = []
-        new_pages = []
-        with OpenAndCloseDbConnection():
-            existing_pages = Page.objects.filter(company_id=company_id).only("content_sha256").in_bulk(field_name="url")
-            for page in crawler.pages:
-                if page.url in existing_pages and existing_pages[page.url].content_sha256 != page.content_sha256:
-                    updated_pages.append(page.url)
-                elif page.url not in existing_pages:
-                    new_pages.append(page.url)
-
-            # Create new pages in the database and update existing ones
-            Page.objects.bulk_create(
-                crawler.pages,
-                512,
-                update_conflicts=True,
-                update_fields=["last_crawl_at", "content_sha256"],
-                unique_fields=["company", "url"]
-            )
-
-            # Save custom audits already run
-            from site_audit.models import DailyPageAudit
-            DailyPageAudit.objects.bulk_create(crawler.audits, 1024)
-
-            # Run PSI audits on updated pages or new pages
-            run_psi_audit.spawn(urls=set(updated_pages + new_pages), company_id=company_id)
+        _finish_crawl(company, crawl_started_at, changed_pages, graph_audits=shards > 1)
+        # Kept until the crawl succeeds: called again, the crawl resumes from its frontier
+        if shards > 1 and settings.SITE_AUDIT_SHARED_FRONTIER:
+            RedisFrontier(f"crawl:{crawl_id}").clear()
+        elif shards > 1:
+            PartitionedFrontier(f"crawl:{crawl_id}", 0, shards).clear()
 
     except Exception as e:
         status = CrawlStatus.FAILED
@@ -350,7 +1263,7 @@ def crawl_website(company_id: int = None, crawl_id: int = None):
             crawl_log = DailyCrawl.objects.get(id=crawl_id)
             crawl_log.finished_at = datetime.now()
             crawl_log.status = status
-            crawl_log.pages_crawled = len(crawler.visited_url)
+            crawl_log.pages_crawled = pages_crawled or crawl_log.pages_crawled
             crawl_log.save()
 
 
@@ -360,13 +1273,18 @@ def crawl_website(company_id: int = None, crawl_id: int = None):
     secrets=[modal.Secret.from_name("database")]
 )
 def daily_crawl():
-    """Scheduled daily to start the crawling process on every website."""
+    """
+    Scheduled daily to start the crawling process on every website.
+
+    Crawls are spawned in the order of 'get_crawl_schedule()': beyond MAX_CONCURRENT_CRAWLS, Modal queues them.
+    """
     django.setup()
     from commons.utils import OpenAndCloseDbConnection
-    from users.models import Company
-    from site_audit.models import DailyCrawl
+    from site_audit.models import DailyCrawl, DailyPageScores
 
     with OpenAndCloseDbConnection():
-        for company in Company.objects.only("id", "website"):
-            crawl_log = DailyCrawl.objects.create(company=company)
-            crawl_website.spawn(company_id=company.id, crawl_id=crawl_log.id)
+        # Retention: drop the daily page audits older than 'settings.SITE_AUDIT_RETENTION_DAYS' (if set)
+        DailyPageScores.purge()
+        for job in get_crawl_schedule():
+            crawl_log = DailyCrawl.objects.create(company_id=job.company_id)
+            crawl_website.spawn(company_id=job.company_id, crawl_id=crawl_log.id, shards=job.shards)
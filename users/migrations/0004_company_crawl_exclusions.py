@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_remove_company_address_remove_company_city_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="company",
+            name="crawl_exclude_pages",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="company",
+            name="crawl_exclude_patterns",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -3,6 +3,7 @@ import uuid
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, Permission, PermissionsMixin
 from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
@@ -121,6 +122,9 @@ class Company(models.Model):
 
     name = models.CharField(max_length=80, unique=True)
     website = models.URLField(null=True, blank=True)
+    # Pages of the website not to crawl, e.g. calendars and faceted search (see 'site_audit.exclusions')
+    crawl_exclude_patterns = models.JSONField(default=list, blank=True)
+    crawl_exclude_pages = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True, null=True)
 
@@ -132,6 +136,19 @@ class Company(models.Model):
         """Returns the slugified name of the company (only characters that are accepted in URL or file names)."""
         return slugify(self.name)
 
+    def clean(self) -> None:
+        """Check that the crawl exclusions are lists of strings, and that the exclude patterns are valid regexes."""
+        from site_audit.exclusions import compile_patterns
+
+        for field in ("crawl_exclude_patterns", "crawl_exclude_pages"):
+            value = getattr(self, field)
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise ValidationError({field: _("Must be a list of strings.")})
+        try:
+            compile_patterns(self.crawl_exclude_patterns)
+        except ValueError as e:
+            raise ValidationError({"crawl_exclude_patterns": str(e)})
+
     def set_basic_custom_fields(self) -> None:
         """Set the basic `AllowedFields` for this Company."""
         AllowedField.objects.bulk_create(